@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+#   encoding: utf-8
+
+# This is part of the Busker library.
+# Copyright (C) 2024 D E Haynes
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from collections import defaultdict
+from collections import deque
+import hashlib
+import json
+import pathlib
+import typing
+
+from busker.core.scraper import Node
+from busker.core.types import Choice
+
+
+class Graph:
+    """
+    The states of a story found by exploration, and the commands between them.
+
+    A state is identified by the content of its page, so that the same state
+    in different sessions is stored once.
+    Each edge is labelled by the Choice which led from one state to the next.
+    The frontier is those states which offer commands not yet tried.
+
+    """
+
+    @staticmethod
+    def key(node: Node) -> str:
+        return hashlib.blake2b(
+            repr((node.title, node.blocks, node.options)).encode("utf8"), digest_size=16
+        ).hexdigest()
+
+    @classmethod
+    def from_state(cls, state: dict) -> typing.Self:
+        rv = cls()
+        for k, v in state.get("options", {}).items():
+            rv.visit(k, v)
+        for k, v in state.get("tried", {}).items():
+            for value in v:
+                rv.mark(k, value)
+        for k, v in state.get("edges", {}).items():
+            for *choice, target in v:
+                rv.edges[k][Choice(*choice)] = target
+        return rv
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> typing.Self:
+        try:
+            return cls.from_state(json.loads(path.read_text()))
+        except FileNotFoundError:
+            return cls()
+
+    def __init__(self):
+        self.options = defaultdict(set)
+        self.tried = defaultdict(set)
+        self.edges = defaultdict(dict)
+        self.frontier = set()
+
+    def __len__(self):
+        return len(self.options)
+
+    @property
+    def state(self) -> dict:
+        """
+        The graph as plain types, which may be serialized as JSON.
+
+        """
+        return dict(
+            options={k: sorted(v) for k, v in self.options.items()},
+            tried={k: sorted(v) for k, v in self.tried.items() if v},
+            edges={k: [list(choice) + [target] for choice, target in v.items()] for k, v in self.edges.items()},
+        )
+
+    def save(self, path: pathlib.Path):
+        path.write_text(json.dumps(self.state))
+
+    def untested(self, state: str) -> set:
+        return self.options[state] - self.tried[state]
+
+    def update(self, state: str):
+        if self.untested(state):
+            self.frontier.add(state)
+        else:
+            self.frontier.discard(state)
+
+    def visit(self, state: str, options: tuple) -> int:
+        """
+        Record the options of a state. Return the number which are new.
+
+        """
+        n = len(self.options[state])
+        self.options[state].update(options)
+        self.update(state)
+        return len(self.options[state]) - n
+
+    def mark(self, state: str, value: str) -> bool:
+        """
+        Record that a command has been tried. Return True if it had not been before.
+
+        """
+        if value not in self.options[state] or value in self.tried[state]:
+            return False
+        self.tried[state].add(value)
+        self.update(state)
+        return True
+
+    def link(self, state: str, choice: Choice, target: str):
+        self.edges[state][choice] = target
+
+    def path(self, state: str) -> list[Choice]:
+        """
+        Find the shortest sequence of recorded commands from `state`
+        to a state on the frontier.
+
+        """
+        if state in self.frontier:
+            return []
+
+        prior = {state: None}
+        queue = deque([state])
+        while queue:
+            node = queue.popleft()
+            for choice, target in self.edges.get(node, {}).items():
+                if target in prior:
+                    continue
+                prior[target] = (node, choice)
+                if target in self.frontier:
+                    rv = []
+                    while prior[target]:
+                        target, choice = prior[target]
+                        rv.insert(0, choice)
+                    return rv
+                queue.append(target)
+        return []
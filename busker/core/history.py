@@ -17,6 +17,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+from collections import Counter
 from collections import defaultdict
 from collections import deque
 import logging
@@ -24,6 +25,8 @@ import pprint
 import sys
 import tomllib
 
+from busker.core.metrics import Latency
+
 
 class SharedLogRecord(logging.LogRecord):
 
@@ -72,10 +75,24 @@ class SharedHistory:
             self.history["head"] = list()
         if "tail" not in self.history:
             self.history["tail"] = deque(maxlen=maxlen)
+        if "metrics" not in self.history:
+            self.history["metrics"] = Counter()
+        if "latency" not in self.history:
+            self.history["latency"] = Latency()
 
         logging.setLogRecordFactory(SharedLogRecord.factory)
         logger = logging.getLogger(self.log_name)
-        logger.addHandler(self.LogMemo(self.history["head"], self.history["tail"]))
+        if not any(isinstance(i, self.LogMemo) for i in logger.handlers):
+            # One handler per logger, however many instances share it
+            logger.addHandler(self.LogMemo(self.history["head"], self.history["tail"]))
+
+    @property
+    def metrics(self) -> Counter:
+        return self.history["metrics"]
+
+    @property
+    def latency(self) -> Latency:
+        return self.history["latency"]
 
     @staticmethod
     def toml_type(obj):
@@ -99,6 +116,11 @@ class SharedHistory:
                 yield f"{{ {items} }},"
             yield "]"
 
+        if metrics := data.get("metrics"):
+            yield "[metrics]"
+            for key, value in sorted(metrics.items()):
+                yield f'"{key}" = {self.toml_type(value)}'
+
     def log(self, msg="", level=logging.INFO, *args, **kwargs):
         logger = logging.getLogger(self.log_name)
         return logger.log(level, msg, *args, **kwargs)
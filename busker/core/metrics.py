@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+#   encoding: utf-8
+
+# This is part of the Busker library.
+# Copyright (C) 2024 D E Haynes
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from collections import Counter
+from collections import defaultdict
+from collections.abc import Generator
+import functools
+import re
+import typing
+import urllib.parse
+
+
+class Histogram:
+    """
+    Counts values in buckets whose width grows with their magnitude,
+    in the manner of an HDR histogram.
+    Values are recorded in whole multiples of `unit`, with a relative error
+    of no more than one part in 2 ** (`bits` - 1).
+
+    """
+
+    def __init__(self, bits: int = 7, unit: float = 1e-6):
+        self.bits = bits
+        self.unit = unit
+        self.counts = Counter()
+        self.total = 0
+        self.sum = 0
+        self.max = 0
+        self.min = None
+
+    def __len__(self):
+        return self.total
+
+    def index(self, value: int) -> int:
+        if value < 1 << self.bits:
+            return value
+        shift = value.bit_length() - self.bits
+        return (shift << (self.bits - 1)) + (value >> shift)
+
+    def highest(self, index: int) -> int:
+        if index < 1 << self.bits:
+            return index
+        shift = (index >> (self.bits - 1)) - 1
+        mantissa = index - (shift << (self.bits - 1))
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, value: float, count: int = 1):
+        value = max(0, round(value / self.unit))
+        self.counts[self.index(value)] += count
+        self.total += count
+        self.sum += value * count
+        self.max = max(self.max, value)
+        self.min = value if self.min is None else min(self.min, value)
+
+    def merge(self, other: typing.Self) -> typing.Self:
+        if (other.bits, other.unit) != (self.bits, self.unit):
+            raise ValueError("Histograms differ in precision")
+        self.counts.update(other.counts)
+        self.total += other.total
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        return self
+
+    @property
+    def mean(self) -> float:
+        return self.total and self.sum * self.unit / self.total
+
+    def percentile(self, percent: float) -> float:
+        rank = max(1, round(percent / 100 * self.total))
+        n = 0
+        for index in sorted(self.counts):
+            n += self.counts[index]
+            if n >= rank:
+                return min(self.highest(index), self.max) * self.unit
+        return self.max * self.unit
+
+
+class Latency:
+    """
+    Histograms of request timings, by action and URL template.
+
+    """
+
+    measures = ("dns", "connect", "ttfb", "elapsed")
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.histograms = defaultdict(functools.partial(Histogram, **kwargs))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def template(url: str) -> str:
+        """
+        Replace identifiers in the path of a URL so that requests
+        to the same resource in different sessions share a template.
+
+        """
+        path = urllib.parse.urlsplit(url).path or "/"
+        return re.sub(
+            r"(?<=/)(?:[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|[0-9a-f]{16,}|\d+)(?=/|$)",
+            "{id}",
+            path,
+            flags=re.IGNORECASE,
+        )
+
+    def record(self, action: str, url: str, node):
+        template = self.template(url)
+        for measure in self.measures:
+            value = getattr(node, measure, None)
+            if value is not None:
+                self.histograms[(action, template, measure)].record(value)
+
+    def merge(self, other: typing.Self) -> typing.Self:
+        for key, histogram in other.histograms.items():
+            self.histograms[key].merge(histogram)
+        return self
+
+    def report(self, percentiles=(50, 90, 99, 99.9)) -> Generator[str]:
+        for (action, template, measure), histogram in sorted(self.histograms.items()):
+            values = " ".join(
+                f"p{percent:g}={histogram.percentile(percent) * 1000:.2f}ms" for percent in percentiles
+            )
+            yield (
+                f"{action:<8} {template:<32} {measure:<8} n={histogram.total:<6} {values}"
+                f" max={histogram.max * histogram.unit * 1000:.2f}ms"
+            )
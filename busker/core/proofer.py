@@ -21,9 +21,9 @@
 
 from collections import Counter
 from collections import namedtuple
+import enum
 import pathlib
 import re
-import string
 import tomllib
 
 
@@ -31,6 +31,22 @@ class Proofer:
 
     Script = namedtuple("Script", ["path", "text", "tables", "errors"], defaults=["", None, None])
 
+    class Rule(enum.StrEnum):
+        FILE_NOT_FOUND = "file-not-found"
+        TOML_DECODE = "toml-decode"
+        STAGE_NO_PUZZLES = "stage-no-puzzles"
+        STAGE_MISSING_ATTRIBUTE = "stage-missing-attribute"
+        STAGE_NO_INIT = "stage-no-init"
+        SCENE_CUE_UNDECLARED = "scene-cue-undeclared"
+        SCENE_ROLE_UNDECLARED = "scene-role-undeclared"
+
+    class Error(str):
+
+        def __new__(cls, text: str, rule: "Proofer.Rule" = None):
+            rv = super().__new__(cls, text)
+            rv.rule = rule
+            return rv
+
     #  Copied from speechmark.py
     cue_matcher = re.compile(
         """
@@ -45,6 +61,28 @@ class Proofer:
         re.VERBOSE,
     )
 
+    # The characters at which str.splitlines ends a line
+    line_breaks = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+    line_matcher = re.compile("\r\n|[" + line_breaks + "]")
+
+    # Cues and format references in a single sweep of the scene text.
+    # A cue is matched only as far as its role, so references inside it are checked too.
+    scene_matcher = re.compile(
+        "(?:^|(?<=[" + line_breaks + "]))"
+        "<(?P<role>[^.:?# >" + line_breaks + "]*)(?=[^ >" + line_breaks + "]*>)"  # Cue at the start of a line
+        "|{{|}}"                                                                    # Escaped braces
+        "|{(?P<reference>[^{}!:" + line_breaks + "]*)"                              # Field reference
+        "(?:[!:](?:[^{}" + line_breaks + "]|{[^{}" + line_breaks + "]*})*)?}"       # Conversion and format spec
+    )
+
+    @classmethod
+    def classify(cls, error: str | Exception) -> Rule:
+        if isinstance(error, tomllib.TOMLDecodeError):
+            return cls.Rule.TOML_DECODE
+        elif isinstance(error, FileNotFoundError):
+            return cls.Rule.FILE_NOT_FOUND
+        return getattr(error, "rule", None)
+
     @classmethod
     def read_toml(cls, text: str, errors: dict = None, **kwargs) -> Script:
         errors = errors or {}
@@ -65,16 +103,18 @@ class Proofer:
 
         return cls.read_toml(text, **kwargs)._replace(path=path.resolve())
 
-    @staticmethod
-    def check_stage(*scripts: tuple[Script], **kwargs):
+    @classmethod
+    def check_stage(cls, *scripts: tuple[Script], **kwargs):
         witness = Counter()
         for script in scripts:
             if not isinstance(script.tables.get("puzzles"), list):
-                script.errors[0] = "No puzzles detected"
+                script.errors[0] = cls.Error("No puzzles detected", cls.Rule.STAGE_NO_PUZZLES)
             else:
                 for n, key in enumerate(("label", "realm")):
                     if key not in script.tables:
-                        script.errors[n] = f"Puzzle strand is missing attribute '{key}'"
+                        script.errors[n] = cls.Error(
+                            f"Puzzle strand is missing attribute '{key}'", cls.Rule.STAGE_MISSING_ATTRIBUTE
+                        )
 
             if any(puzzle.get("init") for puzzle in script.tables.get("puzzles", [])):
                 witness["init"] += 1
@@ -82,29 +122,34 @@ class Proofer:
                 witness["states"] += 1
 
             if script is scripts[-1] and not witness["init"] and not witness["states"]:
-                script.errors[0] = "At least one puzzle must contain states or an 'init' table"
+                script.errors[0] = cls.Error(
+                    "At least one puzzle must contain states or an 'init' table", cls.Rule.STAGE_NO_INIT
+                )
 
             yield script
 
     @classmethod
     def check_scene(cls, script: Script):
-        formatter = string.Formatter()
-        for n, line in enumerate(script.text.splitlines()):
-            cue = cls.cue_matcher.match(line)
-            try:
-                if cue["role"] and cue["role"] not in script.tables:
-                    script.errors[n + 1] = f"Cue for '{cue['role']}' but no role declared"
-            except TypeError:
-                pass
-
-            for result in formatter.parse(line):
-                reference = result[1]
-                try:
-                    path = reference.split(".")
-                    role = path[0]
-                except (AttributeError, IndexError):
+        roles = frozenset(script.tables or ())
+        text = script.text
+        line = 1
+        pos = 0
+        for match in cls.scene_matcher.finditer(text):
+            role, reference = match.group("role", "reference")
+            if role:
+                if role in roles:
                     continue
+                error = cls.Error(f"Cue for '{role}' but no role declared", cls.Rule.SCENE_CUE_UNDECLARED)
+            elif reference is not None:
+                role = reference.partition(".")[0]
+                if role in roles:
+                    continue
+                error = cls.Error(f"Role '{role}' referenced but not declared", cls.Rule.SCENE_ROLE_UNDECLARED)
+            else:
+                continue
 
-                if role not in script.tables:
-                    script.errors[n + 1] = f"Role '{role}' referenced but not declared"
+            # Count lines only as far as the next error
+            line += len(cls.line_matcher.findall(text, pos, match.start()))
+            pos = match.start()
+            script.errors[line] = error
         return script
@@ -18,14 +18,29 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+from collections import Counter
+from collections import defaultdict
+from collections import deque
 from collections import namedtuple
+from collections import OrderedDict
+import asyncio
+import codecs
 import datetime
+import email.parser
 import hashlib
 import functools
+import html
+import http.client
+import http.cookies
+import io
 import logging
 import re
+import socket
+import time
+import typing
+import urllib.error
+import urllib.parse
 import urllib.request
-import xml.etree.ElementTree as ET
 
 from busker.core.history import SharedHistory
 
@@ -37,7 +52,8 @@ Node = namedtuple(
         "url",
         "title", "links", "blocks", "media",
         "options", "forms",
-        "text"
+        "text",
+        "dns", "connect", "ttfb", "elapsed",
     ],
     defaults=[
         None, None,
@@ -45,6 +61,7 @@ Node = namedtuple(
         None, None, None, None,
         None, None,
         None,
+        None, None, None, None,
     ],
 )
 
@@ -65,6 +82,231 @@ Input = namedtuple(
 )
 
 
+class Extractor:
+    """
+    Finds the title, forms and blockquotes of a whole page in a single pass.
+    Only the tags of interest are matched; the rest of the page is skipped.
+    Datalists and labels are indexed by id as they are seen,
+    and resolved against inputs at the end of the page.
+    Blockquotes are kept as raw markup for the Witness to parse.
+
+    Like a browser, the Extractor tolerates tags left open, unquoted attributes
+    and upper case names.
+
+    """
+
+    tag_matcher = re.compile(
+        r"<(?:!--.*?(?:-->|\Z)"
+        r"|(?P<end>/?)(?P<tag>(?i:blockquote|button|datalist|form|input|label|option|script|style|title))"
+        r"(?=[\s/>])(?P<attrs>[^>\"']*(?:(?:\"[^\"]*\"|'[^']*')[^>\"']*)*)>?)",
+        re.DOTALL
+    )
+    attr_matcher = re.compile(
+        r"(?P<name>[^\s/>\"'=]+)(?:\s*=\s*(?:\"(?P<dq>[^\"]*)\"|'(?P<sq>[^']*)'|(?P<uq>[^\s>]+)))?"
+    )
+    end_matchers = {
+        tag: re.compile(f"</{tag}\\s*>", re.IGNORECASE) for tag in ("blockquote", "script", "style")
+    }
+
+    @classmethod
+    def attributes(cls, text: str) -> dict:
+        rv = {}
+        for match in cls.attr_matcher.finditer(text):
+            name, dq, sq, uq = match.groups()
+            # An attribute without a value is None, as html.parser has it
+            value = dq if dq is not None else sq if sq is not None else uq
+            rv[name.lower()] = html.unescape(value) if value and "&" in value else value
+        return rv
+
+    @staticmethod
+    def data(text: str, pos: int) -> str:
+        # Like ElementTree, keep only the text before the first child
+        end = text.find("<", pos)
+        rv = text[pos:] if end == -1 else text[pos:end]
+        return html.unescape(rv) if "&" in rv else rv
+
+    def __init__(self):
+        self.title = None
+        self.blocks = []
+        self.forms = []
+        self.rejects = []
+        self.lists = defaultdict(list)
+        self.labels = {}
+
+    def extract(self, text: str) -> typing.Self:
+        form = None
+        datalist = None
+
+        pos = 0
+        while match := self.tag_matcher.search(text, pos):
+            pos = match.end()
+            end, tag, attrs = match.groups()
+            if tag is None:
+                # A comment
+                continue
+
+            tag = tag.lower()
+            if end:
+                if tag == "datalist":
+                    datalist = None
+                elif tag == "form" and form is not None:
+                    self.forms.append(form)
+                    form = None
+            elif tag == "input":
+                if form is not None:
+                    form["inputs"].append(self.attributes(attrs))
+            elif tag == "option":
+                if datalist is not None:
+                    datalist.append(self.attributes(attrs).get("value"))
+            elif tag in self.end_matchers:
+                # Take the content raw, without parsing it
+                close = self.end_matchers[tag].search(text, pos)
+                if tag == "blockquote":
+                    if close is None:
+                        # Tolerate a blockquote left open
+                        self.blocks.append(text[match.start():].strip())
+                    else:
+                        self.blocks.append((text[match.start():close.start()] + "</blockquote>").strip())
+                pos = len(text) if close is None else close.end()
+            elif tag == "datalist":
+                datalist = self.lists[self.attributes(attrs).get("id")]
+            elif tag == "label":
+                self.labels.setdefault(self.attributes(attrs).get("for"), self.data(text, pos))
+            elif tag == "button":
+                if (
+                    form is not None and form["button"] is None
+                    and self.attributes(attrs).get("type") == "submit"
+                ):
+                    form["button"] = self.data(text, pos)
+            elif tag == "form":
+                # As browsers do, ignore a form nested inside another
+                if form is None:
+                    form = dict(attribs=self.attributes(attrs), inputs=[], button=None)
+            elif tag == "title" and self.title is None:
+                self.title = self.data(text, pos)
+
+        if form is not None:
+            # Tolerate a form left open
+            self.forms.append(form)
+
+        forms = self.forms
+        self.forms = []
+        for form in forms:
+            inputs = tuple(
+                Input(**dict(
+                    {k: v for k, v in attribs.items() if k in Input._fields},
+                    values=tuple(filter(None, self.lists.get(attribs.get("list"), ()))),
+                    label=self.labels.get(attribs.get("name"), ""),
+                ))
+                for attribs in form["inputs"]
+            )
+            try:
+                self.forms.append(Form(**dict(
+                    {k: v for k, v in form["attribs"].items() if k in Form._fields},
+                    inputs=inputs,
+                    button=form["button"],
+                )))
+            except TypeError:
+                self.rejects.append(form["attribs"])
+        return self
+
+
+class ResponseTooLarge(ValueError):
+    pass
+
+
+class Transfer:
+    """
+    Hashes and decodes a response body as it arrives, up to a maximum size.
+    Records the time spent resolving and connecting, the time to the first byte
+    and the time of the whole transfer.
+
+    """
+
+    chunk_size = 16 * 1024
+
+    def __init__(self, url: str = None, max_size: int = None, encoding: str = "utf8"):
+        self.url = url
+        self.max_size = max_size
+        self.hash = hashlib.blake2b()
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.text = []
+        self.size = 0
+        self.start = time.perf_counter()
+        # Left as None unless a connection is made and timed
+        self.dns = None
+        self.connect = None
+        self.ttfb = None
+
+    def connected(self, dns: float, connect: float):
+        # A redirect may open more than one connection
+        self.dns = (self.dns or 0) + dns
+        self.connect = (self.connect or 0) + connect
+
+    def begin(self):
+        if self.ttfb is None:
+            self.ttfb = time.perf_counter() - self.start
+
+    def update(self, chunk: bytes):
+        self.begin()
+        self.size += len(chunk)
+        if self.max_size is not None and self.size > self.max_size:
+            raise ResponseTooLarge(f"Response from {self.url} exceeds {self.max_size} bytes")
+        self.hash.update(chunk)
+        self.text.append(self.decoder.decode(chunk))
+
+    def read(self, response, url: str = None) -> Node:
+        self.begin()
+        while chunk := response.read(self.chunk_size):
+            self.update(chunk)
+        return self.node(url or self.url)
+
+    def node(self, url: str = None) -> Node:
+        self.text.append(self.decoder.decode(b"", final=True))
+        return Node(
+            ts=datetime.datetime.now(datetime.timezone.utc),
+            hash=self.hash.hexdigest(),
+            url=url or self.url,
+            text="".join(self.text),
+            dns=self.dns,
+            connect=self.connect,
+            ttfb=self.ttfb,
+            elapsed=time.perf_counter() - self.start,
+        )
+
+
+class PageCache:
+    """
+    A least-recently-used mapping from the hash of a page to the fields extracted from it.
+
+    """
+
+    fields = ("title", "blocks", "options", "forms")
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key: str) -> dict:
+        try:
+            self.entries.move_to_end(key)
+        except KeyError:
+            return None
+        return self.entries[key]
+
+    def put(self, key: str, node: Node):
+        self.entries[key] = {field: getattr(node, field) for field in self.fields}
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
 class LocalClient(urllib.request.OpenerDirector):
 
     def __init__(self, handlers: list=None):
@@ -82,77 +324,383 @@ class LocalClient(urllib.request.OpenerDirector):
             self.add_handler(handler_class())
 
 
-class Scraper(SharedHistory):
+class ConnectionPool:
+    """
+    An HTTP/1.1 client which keeps connections alive between requests.
+    Like `LocalClient`, it follows redirects and raises HTTPError for error responses.
 
-    @staticmethod
-    @functools.cache
-    def tag_matcher(tag: str):
-        return re.compile(f"(<{tag}.*?>)(.*?)(<\\/{tag}>)", re.DOTALL)
+    """
 
-    @staticmethod
-    def find_forms(body: str):
-        root = ET.fromstring(body)
-        return root.findall(".//form")
+    class Response:
 
-    @staticmethod
-    def find_blocks(body: str):
-        matcher = Scraper.tag_matcher("blockquote")
-        return ["".join(i).strip() for i in matcher.findall(body, re.DOTALL)]
+        def __init__(self, pool, key: tuple, connection: http.client.HTTPConnection, response, url: str):
+            self.pool = pool
+            self.key = key
+            self.connection = connection
+            self.response = response
+            self.url = url
+
+        def __getattr__(self, name):
+            return getattr(self.response, name)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc_val, exc_tb):
+            self.close()
+            return False
+
+        def read(self, amt=None):
+            return self.response.read(amt)
+
+        def close(self):
+            self.pool.release(self.key, self.connection, self.response)
+
+    redirections = {301, 302, 303, 307, 308}
+
+    def __init__(self, maxsize: int = 4, max_redirections: int = 10):
+        self.maxsize = maxsize
+        self.max_redirections = max_redirections
+        self.idle = defaultdict(deque)
+        self.stats = Counter()
+
+    def connect(
+        self, key: tuple, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, transfer: "Transfer" = None
+    ) -> http.client.HTTPConnection:
+        scheme, netloc = key
+        factory = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        self.stats["connections"] += 1
+        connection = factory(netloc, timeout=timeout)
+
+        # Resolve the host apart from connecting, so each can be timed
+        start = time.perf_counter()
+        info = socket.getaddrinfo(connection.host, connection.port, type=socket.SOCK_STREAM)
+        resolved = time.perf_counter()
+        address = info[0][4][:2]
+        connection._create_connection = functools.partial(self.create_connection, address)
+        connection.connect()
+        if transfer:
+            transfer.connected(resolved - start, time.perf_counter() - resolved)
+        return connection
 
     @staticmethod
-    def find_title(doc: str):
-        matcher = Scraper.tag_matcher("title")
-        match = matcher.search(doc)
-        return match and match[2]
-
-    def get_forms(self, body: str):
-        root = ET.fromstring(body)
-        for form_node in root.findall(".//form"):
-            inputs = tuple(
-                Input(**dict(
-                    {k: v for k, v in node.attrib.items() if k in Input._fields},
-                    values=tuple(filter(
-                        None,
-                        (i.attrib.get("value")
-                        for i in list(root.find(".//datalist[@id='{0}']".format(node.attrib.get("list")))) or [])
-                    )),
-                    label=getattr(root.find(".//label[@for='{0}']".format(node.attrib.get("name"))), "text", "")
-                ))
-                for node in form_node.findall(".//input")
+    def create_connection(address: tuple, _, *args, **kwargs):
+        return socket.create_connection(address, *args, **kwargs)
+
+    def release(self, key: tuple, connection: http.client.HTTPConnection, response: http.client.HTTPResponse):
+        if response.isclosed() and not response.will_close and len(self.idle[key]) < self.maxsize:
+            self.idle[key].append(connection)
+        else:
+            connection.close()
+
+    def close(self):
+        for connections in self.idle.values():
+            while connections:
+                connections.popleft().close()
+
+    def send(
+        self, key: tuple, method: str, path: str,
+        data: bytes = None, headers: dict = None, timeout=socket._GLOBAL_DEFAULT_TIMEOUT,
+        transfer: "Transfer" = None,
+    ):
+        headers = headers or {}
+        while self.idle[key]:
+            connection = self.idle[key].popleft()
+            if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                connection.sock.settimeout(timeout)
+            try:
+                connection.request(method, path, body=data, headers=headers)
+                response = connection.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionError):
+                # The server closed this connection while it was idle
+                connection.close()
+                continue
+            self.stats["reused"] += 1
+            break
+        else:
+            connection = self.connect(key, timeout=timeout, transfer=transfer)
+            connection.request(method, path, body=data, headers=headers)
+            response = connection.getresponse()
+
+        self.stats["requests"] += 1
+        return connection, response
+
+    def open(
+        self, url: str, data: bytes = None, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, transfer: "Transfer" = None
+    ) -> Response:
+        method = "GET" if data is None else "POST"
+        for n in range(self.max_redirections + 1):
+            parts = urllib.parse.urlsplit(url)
+            key = (parts.scheme, parts.netloc)
+            path = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+            headers = {"Content-Type": "application/x-www-form-urlencoded"} if data is not None else {}
+            connection, response = self.send(
+                key, method, path, data=data, headers=headers, timeout=timeout, transfer=transfer
             )
+
+            location = response.getheader("Location")
+            if response.status in self.redirections and location:
+                response.read()
+                self.release(key, connection, response)
+                url = urllib.parse.urljoin(url, location)
+                if response.status not in (307, 308):
+                    method, data = "GET", None
+                continue
+
+            if not 200 <= response.status < 300:
+                body = response.read()
+                self.release(key, connection, response)
+                raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(body))
+
+            return self.Response(self, key, connection, response, url)
+
+        raise urllib.error.HTTPError(url, response.status, "Too many redirections", response.headers, None)
+
+
+class AsyncClient:
+    """
+    An HTTP/1.1 client built on asyncio streams.
+    It keeps one connection alive per host and holds the cookies of a single session.
+    Like `ConnectionPool`, it follows redirects and raises HTTPError for error responses.
+
+    """
+
+    Response = namedtuple("Response", ["url", "status", "reason", "headers", "body"])
+
+    redirections = ConnectionPool.redirections
+    bodiless = {204, 304}
+
+    def __init__(self, max_redirections: int = 10):
+        self.max_redirections = max_redirections
+        self.cookies = http.cookies.SimpleCookie()
+        self.streams = {}
+        self.stats = Counter()
+
+    async def connect(self, key: tuple, transfer: "Transfer" = None) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        scheme, netloc = key
+        parts = urllib.parse.urlsplit(f"//{netloc}")
+        port = parts.port or (443 if scheme == "https" else 80)
+        self.stats["connections"] += 1
+
+        # Resolve the host apart from connecting, so each can be timed
+        start = time.perf_counter()
+        info = await asyncio.get_running_loop().getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+        resolved = time.perf_counter()
+        host, port = info[0][4][:2]
+        if scheme == "https":
+            rv = await asyncio.open_connection(host, port, ssl=True, server_hostname=parts.hostname)
+        else:
+            rv = await asyncio.open_connection(host, port)
+        if transfer:
+            transfer.connected(resolved - start, time.perf_counter() - resolved)
+        return rv
+
+    async def close(self):
+        streams, self.streams = self.streams, {}
+        for reader, writer in streams.values():
+            writer.close()
             try:
-                yield Form(**dict(
-                    {k: v for k, v in form_node.attrib.items() if k in Form._fields},
-                    inputs=inputs,
-                    button=getattr(form_node.find(".//button[@type='submit']"), "text", None),
-                ))
-            except TypeError:
-                text = "".join(ET.tostring(form_node, encoding="unicode").splitlines(keepends=False))
-                self.log(f"No user inputs, maybe button: '{text}'", level=logging.WARNING)
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
 
-    def get(self, url=None, **kwargs) -> Node:
-        self.log(f"GET {url=}")
-        client = LocalClient()
-        with client.open(url, **kwargs) as response:
-            reply = response.read()
+    async def chunks(self, reader: asyncio.StreamReader, headers: http.client.HTTPMessage):
+        if headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while size := int((await reader.readline()).split(b";")[0], 16):
+                yield await reader.readexactly(size)
+                await reader.readline()
+            while await reader.readline() not in (b"\r\n", b"\n", b""):
+                # Discard trailers
+                pass
+        elif (length := headers.get("Content-Length")) is not None:
+            length = int(length)
+            while length:
+                chunk = await reader.readexactly(min(length, Transfer.chunk_size))
+                length -= len(chunk)
+                yield chunk
+        else:
+            while chunk := await reader.read(Transfer.chunk_size):
+                yield chunk
 
-        return Node(
-            ts=datetime.datetime.now(datetime.timezone.utc),
-            hash=hashlib.blake2b(reply).hexdigest(),
-            url=response.url,
-            text = reply.decode("utf8"),
+    async def receive(
+        self, reader: asyncio.StreamReader, method: str = "GET", transfer: Transfer = None
+    ) -> tuple[str, int, str, http.client.HTTPMessage, bytes]:
+        status = 100
+        while 100 <= status < 200:
+            # Skip any interim responses
+            status_line = await reader.readline()
+            if not status_line:
+                raise http.client.RemoteDisconnected("Remote end closed connection without response")
+
+            version, status, reason = (status_line.decode("iso-8859-1").rstrip("\r\n").split(None, 2) + [""])[:3]
+            status = int(status)
+            lines = []
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                lines.append(line)
+        headers = email.parser.BytesParser(_class=http.client.HTTPMessage).parsebytes(b"".join(lines))
+
+        body = []
+        if method == "HEAD" or status in self.bodiless:
+            # These responses end with their headers whatever those declare
+            if transfer and 200 <= status < 300:
+                transfer.begin()
+        elif transfer and 200 <= status < 300:
+            transfer.begin()
+            async for chunk in self.chunks(reader, headers):
+                transfer.update(chunk)
+        else:
+            async for chunk in self.chunks(reader, headers):
+                body.append(chunk)
+        return version, status, reason, headers, b"".join(body)
+
+    async def send(
+        self, key: tuple, method: str, path: str,
+        data: bytes = None, headers: dict = None, transfer: Transfer = None
+    ):
+        headers = dict(headers or {}, Host=key[1])
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v.value}" for k, v in self.cookies.items())
+        if data is not None:
+            headers["Content-Length"] = str(len(data))
+        request = "".join(
+            [f"{method} {path} HTTP/1.1\r\n"] + [f"{k}: {v}\r\n" for k, v in headers.items()] + ["\r\n"]
+        ).encode("iso-8859-1") + (data or b"")
+
+        reused = key in self.streams
+        while True:
+            if key not in self.streams:
+                self.streams[key] = await self.connect(key, transfer=transfer)
+            reader, writer = self.streams[key]
+            try:
+                writer.write(request)
+                await writer.drain()
+                version, status, reason, headers, body = await self.receive(reader, method=method, transfer=transfer)
+            except (http.client.RemoteDisconnected, ConnectionError):
+                del self.streams[key]
+                writer.close()
+                if not reused:
+                    raise
+                # The server closed this connection while it was idle
+                reused = False
+                continue
+            except BaseException:
+                # The response was not read to the end
+                del self.streams[key]
+                writer.close()
+                raise
+            break
+
+        self.stats["requests"] += 1
+        self.stats["reused"] += int(reused)
+        if version == "HTTP/1.0" or headers.get("Connection", "").lower() == "close":
+            del self.streams[key]
+            writer.close()
+
+        for cookie in headers.get_all("Set-Cookie", []):
+            self.cookies.load(cookie)
+        return status, reason, headers, body
+
+    async def open(self, url: str, data: bytes = None, timeout: float = None, transfer: Transfer = None) -> Response:
+        async with asyncio.timeout(timeout):
+            method = "GET" if data is None else "POST"
+            for n in range(self.max_redirections + 1):
+                parts = urllib.parse.urlsplit(url)
+                key = (parts.scheme, parts.netloc)
+                path = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+                headers = {"Content-Type": "application/x-www-form-urlencoded"} if data is not None else {}
+                status, reason, headers, body = await self.send(
+                    key, method, path, data=data, headers=headers, transfer=transfer
+                )
+
+                location = headers.get("Location")
+                if status in self.redirections and location:
+                    url = urllib.parse.urljoin(url, location)
+                    if status not in (307, 308):
+                        method, data = "GET", None
+                    continue
+
+                if not 200 <= status < 300:
+                    raise urllib.error.HTTPError(url, status, reason, headers, io.BytesIO(body))
+
+                return self.Response(url, status, reason, headers, body)
+
+        raise urllib.error.HTTPError(url, status, "Too many redirections", headers, None)
+
+
+class Scraper(SharedHistory):
+
+    # Shared by all instances unless one is given
+    cache = PageCache()
+
+    def __init__(
+        self, *args,
+        pool: ConnectionPool = None, cache: PageCache = None, max_size: int = 4 * 1024 * 1024,
+        **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.pool = pool
+        self.max_size = max_size
+        if cache is not None:
+            self.cache = cache
+
+    def extract(self, node: Node) -> Node:
+        if node.hash and (fields := self.cache.get(node.hash)):
+            self.metrics["page_cache_hits"] += 1
+            return node._replace(**fields)
+
+        self.metrics["page_cache_misses"] += 1
+        parser = Extractor().extract(node.text)
+        for attribs in parser.rejects:
+            self.log(f"No user inputs, maybe button: '{attribs}'", level=logging.WARNING)
+
+        rv = node._replace(
+            title=parser.title,
+            blocks=tuple(parser.blocks),
+            options=tuple(v for f in parser.forms for i in f.inputs for v in i.values),
+            forms=tuple(parser.forms),
         )
+        if node.hash:
+            self.cache.put(node.hash, rv)
+        return rv
+
+    def get(self, url=None, **kwargs) -> Node:
+        self.log(f"GET {url=}")
+        transfer = Transfer(url, max_size=self.max_size)
+        client = self.pool or LocalClient()
+        options = dict(kwargs, transfer=transfer) if self.pool else kwargs
+        with client.open(url, **options) as response:
+            return transfer.read(response, url=response.url)
 
     def post(self, url, data=None, **kwargs) -> Node:
         params = urllib.parse.urlencode(data).encode("utf8")
         self.log(f"POST {url=} {params=}")
-        client = LocalClient()
-        with client.open(url, data=params, **kwargs) as response:
-            reply = response.read()
+        transfer = Transfer(url, max_size=self.max_size)
+        client = self.pool or LocalClient()
+        options = dict(kwargs, transfer=transfer) if self.pool else kwargs
+        with client.open(url, data=params, **options) as response:
+            return transfer.read(response, url=response.url)
 
-        return Node(
-            ts=datetime.datetime.now(datetime.timezone.utc),
-            hash=hashlib.blake2b(reply).hexdigest(),
-            url=response.url,
-            text = reply.decode("utf8"),
-        )
+
+class AsyncScraper(Scraper):
+    """
+    A Scraper whose requests are coroutines.
+    Each instance has its own `AsyncClient`, and so its own session cookies.
+
+    """
+
+    def __init__(self, *args, client: AsyncClient = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.client = client or AsyncClient()
+
+    async def get(self, url=None, **kwargs) -> Node:
+        self.log(f"GET {url=}")
+        transfer = Transfer(url, max_size=self.max_size)
+        response = await self.client.open(url, transfer=transfer, **kwargs)
+        return transfer.node(response.url)
+
+    async def post(self, url, data=None, **kwargs) -> Node:
+        params = urllib.parse.urlencode(data).encode("utf8")
+        self.log(f"POST {url=} {params=}")
+        transfer = Transfer(url, max_size=self.max_size)
+        response = await self.client.open(url, data=params, transfer=transfer, **kwargs)
+        return transfer.node(response.url)
@@ -20,13 +20,19 @@
 
 from collections import Counter
 from collections import defaultdict
+from collections import namedtuple
 from collections.abc import Generator
+import array
 import copy
 import enum
+import functools
 import graphlib
 import itertools
 import operator
+import sys
 import tomllib
+import types
+import typing
 import warnings
 
 from busker.core.proofer import Proofer
@@ -35,13 +41,39 @@ from busker.core.types import Event
 
 class Stager:
 
+    Compiled = namedtuple("Compiled", ["index", "puzzles", "levels", "parents", "ancestors", "critical"])
+
+    @staticmethod
+    def freeze(obj):
+        """
+        Return an immutable equivalent of a TOML structure.
+        Tables become read-only mappings, and arrays become tuples.
+
+        """
+        if isinstance(obj, dict):
+            return types.MappingProxyType({k: Stager.freeze(v) for k, v in obj.items()})
+        elif isinstance(obj, list):
+            return tuple(Stager.freeze(i) for i in obj)
+        return obj
+
     @staticmethod
-    def load(*rules: tuple[str]) -> Generator[dict]:
+    def load(*rules: tuple[str], frozen=False) -> Generator[dict]:
         scripts = (Proofer.read_toml(rule) for rule in rules)
         for script in Proofer.check_stage(*scripts):
             for error in script.errors.values():
                 warnings.warn(str(error))
 
+            if frozen:
+                for puzzle in script.tables.get("puzzles", []):
+                    puzzle["events"] = [
+                        dict(
+                            event,
+                            targets=Stager.freeze(event.get("targets", [])),
+                            payload=Stager.freeze(event.get("payload", {})),
+                        )
+                        for event in puzzle.get("events", [])
+                    ]
+
             yield script.tables
 
     @staticmethod
@@ -56,6 +88,7 @@ class Stager:
 
     def __init__(self, rules=[]):
         self._active = []
+        self._done = 0
 
         self.realms = {
             realm: {strand["label"]: strand for strand in strands}
@@ -64,16 +97,13 @@ class Stager:
                 key=operator.itemgetter("realm")
             )
         }
-        self.strands = {
-            realm: graphlib.TopologicalSorter()
-            for realm in self.realms
-        }
+        self.edges = {realm: [] for realm in self.realms}
 
         for realm, strands in self.realms.items():
             for strand in strands.values():
                 for puzzle in strand.get("puzzles", []):
                     if puzzle.get("init"):
-                        self.strands[realm].add(puzzle["name"])
+                        self.edges[realm].append((puzzle["name"],))
 
                     chain = puzzle.get("chain", [])
                     try:
@@ -87,7 +117,16 @@ class Stager:
                         targets = [target for target in chain if target != puzzle["name"]]
 
                     for target in targets:
-                        self.strands[realm].add(target, puzzle["name"])
+                        self.edges[realm].append((target, puzzle["name"]))
+
+        self.strands = self.sorters()
+
+    def sorters(self) -> dict[str, graphlib.TopologicalSorter]:
+        rv = {realm: graphlib.TopologicalSorter() for realm in self.realms}
+        for realm, edges in self.edges.items():
+            for edge in edges:
+                rv[realm].add(*edge)
+        return rv
 
     @property
     def puzzles(self):
@@ -116,6 +155,71 @@ class Stager:
             for name in names
         }
 
+    @functools.cached_property
+    def compiled(self) -> Compiled:
+        """
+        Index every puzzle, in topological order within each realm.
+        Record the depth of each puzzle, its predecessors as bitsets of that index,
+        and the number of puzzles along the critical path of each realm.
+
+        """
+        puzzles = []
+        for realm, sorter in self.sorters().items():
+            puzzles.extend((realm, name) for name in sorter.static_order())
+        sorted_puzzles = set(puzzles)
+        puzzles.extend(i for i in dict.fromkeys(self.puzzles) if i not in sorted_puzzles)
+
+        index = {puzzle: n for n, puzzle in enumerate(puzzles)}
+        levels = [0] * len(puzzles)
+        parents = [0] * len(puzzles)
+        ancestors = [0] * len(puzzles)
+        critical = dict.fromkeys(self.realms, 0)
+        depends = defaultdict(list)
+        for realm, edges in self.edges.items():
+            for name, *predecessors in edges:
+                depends[(realm, name)].extend(predecessors)
+
+        for n, (realm, name) in enumerate(puzzles):
+            for parent in depends[(realm, name)]:
+                p = index[(realm, parent)]
+                levels[n] = max(levels[n], levels[p] + 1)
+                parents[n] |= 1 << p
+                ancestors[n] |= ancestors[p] | 1 << p
+            critical[realm] = max(critical[realm], levels[n] + 1)
+
+        return self.Compiled(index, puzzles, levels, parents, ancestors, critical)
+
+    def mask(self, puzzles: list[tuple[str, str]]) -> int:
+        index = self.compiled.index
+        return functools.reduce(operator.or_, (1 << index[i] for i in puzzles), 0)
+
+    def horizon(self, steps: int = 0, done: int = 0) -> list[tuple[str, str]]:
+        """
+        Return those puzzles not yet done which can become ready
+        after no more than `steps` puzzles in sequence are completed.
+        `done` is a bitset of completed puzzles as returned by `mask`.
+
+        """
+        compiled = self.compiled
+        if not done:
+            return [puzzle for puzzle, level in zip(compiled.puzzles, compiled.levels) if level <= steps]
+
+        rv = []
+        remaining = [0] * len(compiled.puzzles)
+        for n, puzzle in enumerate(compiled.puzzles):
+            if done & 1 << n:
+                continue
+
+            pending = compiled.parents[n] & ~done
+            while pending:
+                bit = pending & -pending
+                remaining[n] = max(remaining[n], remaining[bit.bit_length() - 1] + 1)
+                pending ^= bit
+
+            if remaining[n] <= steps:
+                rv.append(puzzle)
+        return rv
+
     def gather_state(self, state="spot") -> dict[str, list]:
         rv = defaultdict(list)
         for realm, strands in self.realms.items():
@@ -173,25 +277,71 @@ class Stager:
     def active(self):
         return self._active
 
-    def terminate(self, realm: str, name: str, verdict: str, done=True) -> Generator[Event]:
-        verdict = f"Fruition.{verdict}" if "." not in verdict else verdict
+    @property
+    def progress(self) -> bytes:
+        """
+        Serialize the state of play as a bitset of done puzzles,
+        followed by the index of each active puzzle as a 16 bit integer.
+
+        """
+        compiled = self.compiled
+        if len(compiled.puzzles) > 1 << 16:
+            raise ValueError(f"Progress can index no more than {1 << 16} puzzles, not {len(compiled.puzzles)}")
+
+        width = (len(compiled.puzzles) + 7) // 8
+        active = array.array("H", [compiled.index[i] for i in self._active])
+        if sys.byteorder == "big":
+            active.byteswap()
+        return self._done.to_bytes(width, "little") + active.tobytes()
+
+    def resume(self, progress: bytes) -> typing.Self:
+        """
+        Return a copy of this Stager in the state recorded by `progress`.
+        The puzzle graph is shared with the original, and no Events are generated.
+
+        """
+        compiled = self.compiled
+        width = (len(compiled.puzzles) + 7) // 8
+        done = int.from_bytes(progress[:width], "little")
+        active = array.array("H", progress[width:])
+        if sys.byteorder == "big":
+            active.byteswap()
+
+        rv = copy.copy(self)
+        rv.strands = self.sorters()
+        for realm, strand in rv.strands.items():
+            strand.prepare()
+            ready = strand.get_ready()
+            while finished := [name for name in ready if done >> compiled.index[(realm, name)] & 1]:
+                strand.done(*finished)
+                ready = strand.get_ready()
+
+        rv._done = done
+        rv._active = [compiled.puzzles[n] for n in active]
+        return rv
+
+    def emit(self, realm: str, name: str, verdict: str) -> Generator[Event]:
         for strand in self.realms[realm].values():
             for puzzle in strand.get("puzzles", []):
                 if puzzle.get("name") == name:
                     for event in puzzle.get("events", []):
-                        rv = Event(
+                        if event.get("trigger") != verdict:
+                            continue
+
+                        targets = event.get("targets", [])
+                        payload = event.get("payload", {})
+                        if not isinstance(payload, (tuple, types.MappingProxyType)):
+                            payload = copy.deepcopy(payload)
+
+                        yield Event(
                             realm,
                             context=name,
-                            trigger=event.get("trigger"),
-                            targets=t.copy() if not isinstance(t := event.get("targets", []), str) else t,
-                            payload=copy.deepcopy(event.get("payload", {})),
+                            trigger=verdict,
+                            targets=targets.copy() if isinstance(targets, list) else targets,
+                            payload=payload,
                             message=event.get("message", ""),
                             support=event.get("support", 0)
                         )
-                        if rv.trigger == verdict:
-                            yield rv
-                            if rv.context in rv.targets:
-                                done = False
 
                     try:
                         chain_items = puzzle.get("chain", {}).get(verdict.split(".")[-1], {}).items()
@@ -201,16 +351,42 @@ class Stager:
                     for target, events in chain_items:
                         events = [events] if not isinstance(events, list) else events
                         for event in events:
-                            rv = Event(realm, name, verdict, target, event, "")
-                            if rv.trigger == verdict:
-                                yield rv
-                                if rv.context in rv.targets:
-                                    done = False
-
-        if done:
-            self.strands[realm].done(name)
-            self._active.remove((realm, name))
-        self._active.extend(
-            [(realm, name) for realm, strand in self.strands.items() for name in strand.get_ready()]
-        )
+                            yield Event(realm, name, verdict, target, event, "")
+
+    def terminate(self, realm: str, name: str, verdict: str, done=True) -> Generator[Event]:
+        yield from self.terminate_many([(realm, name, verdict)], done=done)
 
+    def terminate_many(self, verdicts: list[tuple[str, str, str]], done=True) -> Generator[Event]:
+        """
+        Generate the Events for a batch of puzzle verdicts, in the order given.
+        Readiness is recomputed once for each realm in the batch,
+        after all the Events have been consumed, or sooner for a puzzle
+        made ready by an earlier verdict in the same batch.
+
+        """
+        realms = []
+        try:
+            for realm, name, verdict in verdicts:
+                verdict = f"Fruition.{verdict}" if "." not in verdict else verdict
+                complete = done
+                for event in self.emit(realm, name, verdict):
+                    yield event
+                    if event.context in event.targets:
+                        complete = False
+
+                if realm not in realms:
+                    realms.append(realm)
+
+                if not complete:
+                    continue
+
+                if (realm, name) not in self._active:
+                    self._active.extend([(realm, i) for i in self.strands[realm].get_ready()])
+                self.strands[realm].done(name)
+                self._active.remove((realm, name))
+                self._done |= 1 << self.compiled.index[(realm, name)]
+        finally:
+            # Leave the Stager consistent even if a verdict is rejected
+            self._active.extend(
+                [(realm, name) for realm in realms for name in self.strands[realm].get_ready()]
+            )
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+#   encoding: utf-8
+
+# This is part of the Busker library.
+# Copyright (C) 2024 D E Haynes
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import pathlib
+import tempfile
+import unittest
+
+from busker.core.graph import Graph
+from busker.core.scraper import Node
+from busker.core.types import Choice
+
+
+class GraphTests(unittest.TestCase):
+
+    @staticmethod
+    def graph() -> Graph:
+        """
+        a -x-> b -y-> c
+        a -w-> a      c has an untried option
+
+        """
+        rv = Graph()
+        rv.visit("a", ("w", "x"))
+        rv.visit("b", ("y",))
+        rv.visit("c", ("z", "v"))
+        for state, value, target in [("a", "w", "a"), ("a", "x", "b"), ("b", "y", "c"), ("c", "z", "a")]:
+            rv.mark(state, value)
+            rv.link(state, Choice("command", "text", value), target)
+        return rv
+
+    def test_key(self):
+        a = Node(None, "0" * 16, title="A", blocks=("text",), options=("yes",))
+        b = a._replace(hash="1" * 16, url="http://localhost/session/1")
+        self.assertEqual(Graph.key(a), Graph.key(b))
+        self.assertNotEqual(Graph.key(a), Graph.key(a._replace(options=("no",))))
+
+    def test_mark(self):
+        graph = self.graph()
+        self.assertEqual(graph.frontier, {"c"})
+        self.assertEqual(graph.untested("c"), {"v"})
+        self.assertFalse(graph.mark("c", "z"))
+        self.assertFalse(graph.mark("c", "unknown"))
+        self.assertTrue(graph.mark("c", "v"))
+        self.assertFalse(graph.frontier)
+
+    def test_path(self):
+        graph = self.graph()
+        self.assertEqual([i.value for i in graph.path("a")], ["x", "y"])
+        self.assertEqual([i.value for i in graph.path("b")], ["y"])
+        self.assertEqual(graph.path("c"), [])
+
+        graph.mark("c", "v")
+        self.assertEqual(graph.path("a"), [])
+
+    def test_state(self):
+        graph = self.graph()
+        state = json.loads(json.dumps(graph.state))
+        rv = Graph.from_state(state)
+        self.assertEqual(rv.state, graph.state)
+        self.assertEqual(rv.frontier, graph.frontier)
+        self.assertEqual(rv.path("a"), graph.path("a"))
+
+    def test_load(self):
+        with tempfile.TemporaryDirectory() as parent:
+            path = pathlib.Path(parent).joinpath("graph.json")
+            self.assertEqual(len(Graph.load(path)), 0)
+
+            self.graph().save(path)
+            self.assertEqual(len(Graph.load(path)), 3)
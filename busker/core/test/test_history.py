@@ -17,6 +17,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+from collections import Counter
 from collections import deque
 import datetime
 import logging
@@ -49,12 +50,14 @@ class TOMLTests(unittest.TestCase):
             tail=deque([
                 logging.makeLogRecord(dict(data, asctime=datetime.datetime.now().isoformat(), lineno=n * 10))
                 for n in range(12)
-            ])
+            ]),
+            metrics=Counter(page_cache_hits=3, page_cache_misses=1),
         )
 
         obj = SharedHistory()
         self.assertIsInstance(obj.history["head"], list)
         self.assertIsInstance(obj.history["tail"], deque)
+        self.assertIsInstance(obj.metrics, Counter)
 
         lines = list(obj.toml_lines(records))
 
@@ -70,3 +73,5 @@ class TOMLTests(unittest.TestCase):
                 record = logging.makeLogRecord(output[0])
                 self.assertIsInstance(record, SharedLogRecord)
                 self.assertEqual(record.getMessage(), "Learn your 'abc's!", vars(record))
+
+        self.assertEqual(data["metrics"], {"page_cache_hits": 3, "page_cache_misses": 1})
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+#   encoding: utf-8
+
+# This is part of the Busker library.
+# Copyright (C) 2024 D E Haynes
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import random
+import unittest
+
+from busker.core.metrics import Histogram
+from busker.core.metrics import Latency
+from busker.core.scraper import Node
+
+
+class HistogramTests(unittest.TestCase):
+
+    def test_index(self):
+        histogram = Histogram(bits=4)
+        indexes = [histogram.index(i) for i in range(4096)]
+        self.assertEqual(indexes, sorted(indexes))
+        self.assertEqual(indexes[:16], list(range(16)))
+        errors = [histogram.highest(index) - value for value, index in enumerate(indexes)]
+        self.assertGreaterEqual(min(errors), 0)
+        self.assertTrue(all(error <= value / 8 for value, error in enumerate(errors)))
+
+    def test_percentile(self):
+        histogram = Histogram()
+        for i in range(1, 1001):
+            histogram.record(i / 1000)
+
+        self.assertEqual(len(histogram), 1000)
+        self.assertAlmostEqual(histogram.mean, 0.5005)
+        for percent in (50, 90, 99):
+            with self.subTest(percent=percent):
+                self.assertAlmostEqual(histogram.percentile(percent), percent / 100, delta=percent / 100 / 64)
+        self.assertEqual(histogram.percentile(100), 1.0)
+
+    def test_merge(self):
+        values = [random.expovariate(100) for i in range(1000)]
+        whole = Histogram()
+        parts = [Histogram(), Histogram()]
+        for n, value in enumerate(values):
+            whole.record(value)
+            parts[n % 2].record(value)
+
+        merged = parts[0].merge(parts[1])
+        self.assertEqual(merged.counts, whole.counts)
+        self.assertEqual(merged.percentile(99), whole.percentile(99))
+        self.assertEqual((merged.min, merged.max), (whole.min, whole.max))
+
+        with self.assertRaises(ValueError):
+            whole.merge(Histogram(bits=4))
+
+
+class LatencyTests(unittest.TestCase):
+
+    def test_template(self):
+        self.assertEqual(Latency.template("http://localhost:8080"), "/")
+        self.assertEqual(
+            Latency.template("http://localhost:8080/session/79453e2d-d200-44f5-84b1-7dde4f25fc90/command"),
+            "/session/{id}/command"
+        )
+        self.assertEqual(Latency.template("http://localhost:8080/session/1?q=2"), "/session/{id}")
+        self.assertEqual(Latency.template("http://localhost:8080/sessions"), "/sessions")
+
+    def test_template_cache(self):
+        # Each session has its own URLs, so the cache must be bounded
+        for n in range(2 * Latency.template.cache_info().maxsize):
+            Latency.template(f"http://localhost:8080/session/{n:032x}/command")
+        info = Latency.template.cache_info()
+        self.assertLessEqual(info.currsize, info.maxsize)
+
+    def test_report(self):
+        latency = Latency()
+        for n in range(10):
+            # Only the first request opens a connection
+            node = Node(
+                None, None, dns=None if n else 0.001, connect=None if n else 0.002, ttfb=0.01, elapsed=0.02
+            )
+            latency.record("Write", f"http://localhost/session/{n}/command", node)
+            latency.record("Read", f"http://localhost/session/{n}", Node(None, None))
+
+        self.assertEqual(len(latency.histograms), 4)
+        self.assertEqual(latency.histograms[("Write", "/session/{id}/command", "ttfb")].total, 10)
+        self.assertEqual(latency.histograms[("Write", "/session/{id}/command", "dns")].total, 1)
+
+        lines = list(latency.report(percentiles=[50]))
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(all(line.startswith("Write") for line in lines))
+        self.assertIn("p50=10.00ms", lines[-1])
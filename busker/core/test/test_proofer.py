@@ -19,7 +19,9 @@
 
 import os
 import pathlib
+import sys
 import tempfile
+import time
 import textwrap
 import tomllib
 import unittest
@@ -162,3 +164,68 @@ class ProoferTests(unittest.TestCase):
         finally:
             os.close(fd)
             path.unlink()
+
+    def test_check_scene_lines(self):
+        text = textwrap.dedent("""
+        [ALICE]
+        name = "Alice"
+
+        [[_]]
+        s='''
+        <ALICE>Hey, {{BORIS}}!
+
+        <BORIS.proposing>Hey, {ALICE.name:>{width}}!
+        <ALICE>I'm {ALICE.name!r}, not {CHARLIE.name}.
+        Are you {DAVE[0]}?
+        <>Nobody
+        '''
+        """).strip()
+        script = Proofer.check_scene(Proofer.read_toml(text))
+        self.assertEqual(list(script.errors), [8, 9, 10], script.errors)
+        self.assertIn("BORIS", script.errors[8])
+        self.assertIn("CHARLIE", script.errors[9])
+        self.assertIn("DAVE[0]", script.errors[10])
+
+    def test_check_scene_reference_in_cue(self):
+        script = Proofer.Script(None, "<ALICE?to={CHARLIE.name}>Hello there.", {"ALICE": {}}, {})
+        script = Proofer.check_scene(script)
+        self.assertEqual(list(script.errors), [1], script.errors)
+        self.assertIn("CHARLIE", script.errors[1])
+        self.assertEqual(Proofer.classify(script.errors[1]), Proofer.Rule.SCENE_ROLE_UNDECLARED)
+
+    def test_check_scene_line_breaks(self):
+        text = "<ALICE>One\r<BORIS>Two\r\n{CHARLIE}\x0c<DAVE>Four"
+        script = Proofer.check_scene(Proofer.Script(None, text, {"ALICE": {}}, {}))
+        self.assertEqual(list(script.errors), [2, 3, 4], script.errors)
+        self.assertEqual(len(text.splitlines()), 4)
+
+    def test_classify(self):
+        script = Proofer.read_toml("]")
+        self.assertEqual(Proofer.classify(script.errors[1]), Proofer.Rule.TOML_DECODE)
+
+        script = Proofer.check_scene(Proofer.read_toml('s = """\n<BORIS>Hello\n"""'))
+        self.assertEqual(Proofer.classify(script.errors[2]), Proofer.Rule.SCENE_CUE_UNDECLARED)
+        self.assertIsNone(Proofer.classify("Unclassified"))
+
+
+@unittest.skipUnless(os.environ.get("BUSKER_BENCHMARK"), "Set BUSKER_BENCHMARK to run benchmarks")
+class ProoferBenchmarkTests(unittest.TestCase):
+
+    def test_check_scene(self):
+        lines = ["[ALICE]", 'name = "Alice"', "", "[[_]]", "s='''"]
+        for n in range(20000):
+            if n % 100 == 0:
+                lines.append(f"<BORIS>Line {n}, {{ALICE.name}}.")
+            else:
+                lines.append(f"<ALICE>Line {n}, {{ALICE.name}} says {{{{quoted}}}}.")
+        lines.append("'''")
+        script = Proofer.read_toml("\n".join(lines))
+
+        start = time.perf_counter()
+        script = Proofer.check_scene(script)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(script.errors), 200)
+        self.assertEqual(min(script.errors), 6)
+        self.assertTrue(all("BORIS" in i for i in script.errors.values()))
+        print(f"Proofer.check_scene: {len(lines)} lines in {elapsed:.3f}s", file=sys.stderr)
@@ -17,10 +17,31 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import asyncio
+import hashlib
+import http.server
+import io
+import os
+import re
+import sys
+import threading
+import timeit
 import unittest
 import textwrap
+import xml.etree.ElementTree as ET
 from types import SimpleNamespace
+import urllib.error
 
+from busker.core.scraper import AsyncClient
+from busker.core.scraper import AsyncScraper
+from busker.core.scraper import ConnectionPool
+from busker.core.scraper import Extractor
+from busker.core.scraper import Form
+from busker.core.scraper import Input
+from busker.core.scraper import Node
+from busker.core.scraper import PageCache
+from busker.core.scraper import ResponseTooLarge
+from busker.core.scraper import Transfer
 from busker.core.scraper import Scraper
 
 
@@ -146,48 +167,487 @@ class ScraperTests(unittest.TestCase):
         """),
     )
 
-    def test_find_home_begin(self):
-        scraper = Scraper()
-        body_re = scraper.tag_matcher("body")
-        match = body_re.search(self.fixtures.Home)
-        rv = scraper.find_forms(match[0])
-        self.assertEqual(len(rv), 1)
-
-    def test_find_session_command(self):
-        scraper = Scraper()
-        body_re = scraper.tag_matcher("body")
-        match = body_re.search(self.fixtures.Session)
-        rv = scraper.find_forms(match[0])
-        self.assertEqual(len(rv), 1)
-
-    def test_find_title(self):
-        scraper = Scraper()
-        for n, text in enumerate((self.fixtures.Home, self.fixtures.Session)):
-            with self.subTest(n=n, text=text):
-                title = scraper.find_title(text)
-                if n == 0:
-                    self.assertIsNone(title)
-                else:
-                    self.assertEqual(title, "Story", title)
-
-    def test_find_blocks(self):
-        scraper = Scraper()
-        blocks = scraper.find_blocks(self.fixtures.Session)
-        self.assertEqual(len(blocks), 2)
-        self.assertTrue(all(i.startswith("<blockquote") for i in blocks))
-        self.assertTrue(all(i.endswith("blockquote>") for i in blocks))
-
-    def test_get_forms_from_session(self):
-        scraper = Scraper()
-        for n, text in enumerate((self.fixtures.Home, self.fixtures.Session)):
-            with self.subTest(n=n, text=text):
-                body_re = scraper.tag_matcher("body")
-                match = body_re.search(text)
-                form = next(scraper.get_forms(match[0]), None)
-                self.assertTrue(form)
-                if n == 0:
-                    self.assertTrue(all(form._replace(inputs=True)), form)
-                else:
-                    self.assertTrue(all(form), form)
-                    self.assertTrue(all(form.inputs))
-                    self.assertTrue(all(i for i in form.inputs))
+    def test_extract(self):
+        scraper = Scraper(cache=PageCache())
+        home = scraper.extract(Node(None, None, text=self.fixtures.Home))
+        self.assertIsNone(home.title)
+        self.assertFalse(home.blocks)
+        self.assertFalse(home.options)
+        self.assertEqual(
+            home.forms, (Form(name="ballad-form-start", action="/sessions", method="POST", inputs=(), button="Begin"),)
+        )
+
+        node = scraper.extract(Node(None, None, text=self.fixtures.Session))
+        self.assertEqual(node.title, "Story")
+        self.assertEqual(len(node.blocks), 2)
+        self.assertTrue(all(i.startswith("<blockquote") for i in node.blocks))
+        self.assertTrue(all(i.endswith("</blockquote>") for i in node.blocks))
+        self.assertEqual(node.options, ("1", "2", "i", "info", "no", "yes"))
+
+        form = node.forms[0]
+        self.assertEqual(form.name, "ballad-command-form")
+        self.assertEqual(form.method, "post")
+        self.assertEqual(form.button, "Enter")
+        self.assertEqual(len(form.inputs), 1)
+        self.assertEqual(form.inputs[0].name, "ballad-command-form-input-text")
+        self.assertEqual(form.inputs[0].type, "text")
+        self.assertEqual(form.inputs[0].pattern, "[\\w ]+")
+        self.assertEqual(form.inputs[0].label, ">")
+
+    def test_extract_many_inputs(self, n=1000):
+        body = "<body>{0}<form action='/' method='post' name='many'>{1}</form></body>".format(
+            "".join(
+                f"<datalist id='list-{i:04d}'><option value='{i}' /><option value='x' /></datalist>"
+                f"<label for='input-{i:04d}'>Label {i}</label>"
+                for i in range(n)
+            ),
+            "".join(f"<input name='input-{i:04d}' list='list-{i:04d}' />" for i in range(n)),
+        )
+        node = Scraper(cache=PageCache()).extract(Node(None, None, text=body))
+        form = node.forms[0]
+        self.assertEqual(len(form.inputs), n)
+        self.assertTrue(all(i.values == (str(n), "x") for n, i in enumerate(form.inputs)))
+        self.assertTrue(all(i.label == f"Label {n}" for n, i in enumerate(form.inputs)))
+
+    def test_extract_tolerant(self):
+        text = textwrap.dedent("""
+        <!DOCTYPE html>
+        <HTML><head><title>Story &amp; Song</title></head>
+        <body>
+        <p>Unclosed paragraph&nbsp;and a line break<br>
+        <blockquote cite="&lt;GOAL&gt;"><p>Unclosed<li>item</blockquote>
+        <datalist id=options><option value=yes><option value="no"></datalist>
+        <form action="/session/1/command" method=post name=command>
+        <label for=text>&gt;</label>
+        <input name=text list=options autofocus type=text>
+        <button type=submit>Enter</button>
+        </form>
+        <blockquote>Left open
+        """)
+        with self.assertRaises(ET.ParseError):
+            ET.fromstring(text)
+
+        node = Scraper().extract(Node(None, None, text=text))
+        self.assertEqual(node.title, "Story & Song")
+        self.assertEqual(len(node.blocks), 2, node.blocks)
+        self.assertTrue(node.blocks[0].endswith("</blockquote>"))
+        self.assertEqual(node.blocks[1], "<blockquote>Left open")
+        self.assertEqual(node.options, ("yes", "no"))
+
+        form = node.forms[0]
+        self.assertEqual(form.action, "/session/1/command")
+        self.assertEqual(form.button, "Enter")
+        self.assertEqual(form.inputs[0].label, ">")
+        self.assertEqual(form.inputs[0].type, "text")
+
+    def test_extractor(self):
+        parser = Extractor().extract(self.fixtures.Session)
+        self.assertEqual(parser.title, "Story")
+        self.assertEqual(len(parser.blocks), 2)
+        self.assertEqual([i.name for i in parser.forms], ["ballad-command-form"])
+        self.assertFalse(parser.rejects)
+
+    def test_extract_skips(self):
+        text = textwrap.dedent("""
+        <html><head><TITLE>Story</TITLE>
+        <script>document.write("<form name='script'><input name='x'></form>");</script>
+        </head><body>
+        <!-- <form name="comment"><input name="y"></form> -->
+        <FORM action="/" method="POST" name="real"><INPUT name="z" required></FORM>
+        </body></html>
+        """)
+        node = Scraper(cache=PageCache()).extract(Node(None, None, text=text))
+        self.assertEqual(node.title, "Story")
+        self.assertEqual([i.name for i in node.forms], ["real"])
+        self.assertEqual(node.forms[0].method, "POST")
+        self.assertEqual(node.forms[0].inputs[0].name, "z")
+        self.assertIsNone(node.forms[0].inputs[0].required)
+
+    def test_transfer(self):
+        text = "Café crème " * 1000
+        reply = text.encode("utf8")
+        transfer = Transfer("http://localhost/")
+        for n in range(0, len(reply), 7):
+            transfer.update(reply[n:n + 7])
+        node = transfer.node()
+        self.assertEqual(node.text, text)
+        self.assertEqual(node.hash, hashlib.blake2b(reply).hexdigest())
+        self.assertEqual(node.url, "http://localhost/")
+
+        transfer = Transfer(max_size=len(reply) - 1)
+        with self.assertRaises(ResponseTooLarge):
+            transfer.read(io.BytesIO(reply))
+
+    def test_page_cache(self):
+        cache = PageCache(maxsize=2)
+        for n in range(3):
+            cache.put(str(n), Node(None, str(n), title=f"Page {n}"))
+            self.assertLessEqual(len(cache), 2)
+
+        self.assertIsNone(cache.get("0"))
+        self.assertEqual(cache.get("1")["title"], "Page 1")
+        cache.put("3", Node(None, "3"))
+        self.assertIsNone(cache.get("2"))
+        self.assertTrue(cache.get("1"))
+
+    def test_extract_cached(self):
+        scraper = Scraper(cache=PageCache())
+        metrics = scraper.metrics.copy()
+        node = Node(None, "0" * 16, text=self.fixtures.Session)
+
+        first = scraper.extract(node)
+        second = scraper.extract(node._replace(text=""))
+        self.assertEqual(first.forms, second.forms)
+        self.assertEqual(first.blocks, second.blocks)
+        self.assertEqual(first.title, second.title)
+        self.assertEqual(scraper.metrics["page_cache_misses"] - metrics["page_cache_misses"], 1)
+        self.assertEqual(scraper.metrics["page_cache_hits"] - metrics["page_cache_hits"], 1)
+
+
+@unittest.skipUnless(os.environ.get("BUSKER_BENCHMARK"), "Set BUSKER_BENCHMARK to run benchmarks")
+class ExtractorBenchmarkTests(unittest.TestCase):
+
+    @staticmethod
+    def legacy(text: str) -> tuple:
+        # The ElementTree path which the Extractor replaced
+        title = re.search("<title.*?>(.*?)</title>", text, re.DOTALL)
+        body = re.search("<body.*?>.*?</body>", text, re.DOTALL)[0]
+        blocks = tuple(i.strip() for i in re.findall("<blockquote.*?>.*?</blockquote>", body, re.DOTALL))
+        root = ET.fromstring(body)
+        lists = {}
+        for node in root.iter("datalist"):
+            lists.setdefault(node.attrib.get("id"), node)
+        labels = {}
+        for node in root.iter("label"):
+            labels.setdefault(node.attrib.get("for"), node)
+
+        forms = tuple(
+            Form(**dict(
+                {k: v for k, v in form.attrib.items() if k in Form._fields},
+                inputs=tuple(
+                    Input(**dict(
+                        {k: v for k, v in node.attrib.items() if k in Input._fields},
+                        values=tuple(filter(
+                            None, (i.attrib.get("value") for i in lists.get(node.attrib.get("list"), []))
+                        )),
+                        label=getattr(labels.get(node.attrib.get("name")), "text", ""),
+                    ))
+                    for node in form.iter("input")
+                ),
+                button=getattr(form.find(".//button[@type='submit']"), "text", None),
+            ))
+            for form in root.iter("form")
+        )
+        return (title and title[1], blocks, forms)
+
+    def setUp(self):
+        self.scraper = Scraper(cache=PageCache())
+
+    def single(self, text: str) -> tuple:
+        node = self.scraper.extract(Node(None, None, text=text))
+        return (node.title, node.blocks, node.forms)
+
+    def test_extract_rate(self, number=2000):
+        text = ScraperTests.fixtures.Session
+        self.assertEqual(self.single(text), self.legacy(text))
+
+        legacy = min(timeit.repeat(lambda: self.legacy(text), number=number, repeat=3)) / number
+        single = min(timeit.repeat(lambda: self.single(text), number=number, repeat=3)) / number
+        print(
+            f"Extractor: {single * 1e6:.1f}us per page, ElementTree: {legacy * 1e6:.1f}us per page",
+            file=sys.stderr
+        )
+        self.assertLess(single, legacy)
+
+
+class StoryHandler(http.server.BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+    pages = {
+        "/": ScraperTests.fixtures.Home,
+        "/session/1": ScraperTests.fixtures.Session,
+    }
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status: int, body: str = "", headers: dict = {}):
+        content = body.encode("utf8")
+        self.send_response(status)
+        for k, v in dict(headers, **{"Content-Length": len(content)}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        if self.path == "/drop":
+            # Close without warning the client
+            self.close_connection = True
+            self.path = "/"
+
+        if self.path == "/cookie":
+            return self.reply(200, self.headers.get("Cookie", ""))
+        elif self.path == "/chunked":
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for chunk in (b"Hello, ", b"World!"):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        elif self.path == "/truncated":
+            # Promise more than is sent, then close
+            self.close_connection = True
+            self.send_response(200)
+            self.send_header("Content-Length", 1000)
+            self.end_headers()
+            self.wfile.write(b"<html>")
+            return
+        elif self.path == "/garbled":
+            self.close_connection = True
+            self.wfile.write(b"HTTP/1.1 OK\r\n\r\n")
+            return
+        elif self.path == "/empty":
+            # An interim response, then one which ends with its headers
+            self.send_response_only(100)
+            self.end_headers()
+            self.send_response(204)
+            self.end_headers()
+            return
+
+        try:
+            self.reply(200, self.pages[self.path], {"Content-Type": "text/html"})
+        except KeyError:
+            self.reply(404, "Not found")
+
+    def do_HEAD(self):
+        content = self.pages.get(self.path, "").encode("utf8")
+        self.send_response(200 if content else 404)
+        self.send_header("Content-Length", len(content))
+        self.end_headers()
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.reply(303, headers={"Location": "/session/1", "Set-Cookie": f"session={len(data)}; Path=/"})
+
+
+class ServerTests(unittest.TestCase):
+    """
+    Runs a local server for the tests of a class.
+    Subclasses set `handler` to change its replies.
+
+    """
+
+    handler = StoryHandler
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), cls.handler)
+        cls.server.daemon_threads = True
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = "http://{0}:{1}".format(*cls.server.server_address)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+
+class ConnectionPoolTests(ServerTests):
+
+    def test_keep_alive(self):
+        pool = ConnectionPool()
+        self.addCleanup(pool.close)
+        scraper = Scraper(pool=pool)
+        for n in range(4):
+            node = scraper.get(f"{self.url}/", timeout=2)
+            self.assertIn("ballad-form-start", node.text)
+
+        node = scraper.post(f"{self.url}/sessions", data={})
+        self.assertEqual(node.url, f"{self.url}/session/1")
+        self.assertIn("ballad-command-form", node.text)
+
+        self.assertEqual(pool.stats["connections"], 1, pool.stats)
+        self.assertEqual(pool.stats["requests"], 6, pool.stats)
+        self.assertEqual(pool.stats["reused"], 5, pool.stats)
+
+    def test_http_error(self):
+        pool = ConnectionPool()
+        self.addCleanup(pool.close)
+        scraper = Scraper(pool=pool)
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            scraper.get(f"{self.url}/missing")
+        self.assertEqual(context.exception.code, 404)
+
+        node = scraper.get(f"{self.url}/")
+        self.assertTrue(node.text)
+        self.assertEqual(pool.stats["connections"], 1, pool.stats)
+
+    def test_timing(self):
+        pool = ConnectionPool()
+        self.addCleanup(pool.close)
+        scraper = Scraper(pool=pool)
+        node = scraper.get(f"{self.url}/")
+        self.assertGreater(node.ttfb, 0)
+        self.assertGreaterEqual(node.elapsed, node.ttfb)
+        self.assertGreater(node.dns, 0)
+        self.assertGreater(node.connect, 0)
+        self.assertEqual(node.text, StoryHandler.pages["/"])
+
+        # No connection is timed when one is reused
+        node = scraper.get(f"{self.url}/")
+        self.assertEqual((node.dns, node.connect), (None, None))
+        self.assertGreater(node.ttfb, 0)
+
+        # Nor when urllib makes the connection
+        node = Scraper().get(f"{self.url}/")
+        self.assertEqual((node.dns, node.connect), (None, None))
+        self.assertGreater(node.ttfb, 0)
+
+    def test_max_size(self):
+        pool = ConnectionPool()
+        self.addCleanup(pool.close)
+        scraper = Scraper(pool=pool, max_size=128)
+        with self.assertRaises(ResponseTooLarge):
+            scraper.get(f"{self.url}/")
+
+        node = scraper.get(f"{self.url}/cookie")
+        self.assertEqual(node.text, "")
+
+    def test_stale_connection(self):
+        pool = ConnectionPool()
+        self.addCleanup(pool.close)
+        scraper = Scraper(pool=pool)
+        scraper.get(f"{self.url}/drop")
+        self.assertEqual(sum(len(i) for i in pool.idle.values()), 1)
+
+        node = scraper.get(f"{self.url}/")
+        self.assertTrue(node.text)
+        self.assertEqual(pool.stats["connections"], 2, pool.stats)
+
+
+class AsyncClientTests(ServerTests):
+
+    def test_keep_alive(self):
+
+        async def session():
+            scraper = AsyncScraper()
+            nodes = [await scraper.get(f"{self.url}/", timeout=2) for n in range(4)]
+            nodes.append(await scraper.post(f"{self.url}/sessions", data={}, timeout=2))
+            await scraper.client.close()
+            return scraper.client, nodes
+
+        client, nodes = asyncio.run(session())
+        self.assertTrue(all("ballad-form-start" in node.text for node in nodes[:4]))
+        self.assertEqual(nodes[-1].url, f"{self.url}/session/1")
+        self.assertIn("ballad-command-form", nodes[-1].text)
+
+        self.assertEqual(client.stats["connections"], 1, client.stats)
+        self.assertEqual(client.stats["requests"], 6, client.stats)
+        self.assertEqual(client.stats["reused"], 5, client.stats)
+        self.assertFalse(client.streams)
+
+    def test_cookies(self):
+
+        async def session(data: dict):
+            scraper = AsyncScraper()
+            await scraper.post(f"{self.url}/sessions", data=data)
+            node = await scraper.get(f"{self.url}/cookie")
+            await scraper.client.close()
+            return node.text
+
+        async def sessions():
+            return await asyncio.gather(*(session({"n": "x" * n}) for n in range(3)))
+
+        rv = asyncio.run(sessions())
+        self.assertEqual(rv, ["session=2", "session=3", "session=4"])
+
+    def test_chunked(self):
+
+        async def session(transfer: Transfer = None):
+            client = AsyncClient()
+            try:
+                return await client.open(f"{self.url}/chunked", transfer=transfer)
+            finally:
+                await client.close()
+
+        response = asyncio.run(session())
+        self.assertEqual(response.body, b"Hello, World!")
+
+        transfer = Transfer(max_size=16)
+        response = asyncio.run(session(transfer))
+        self.assertEqual(response.body, b"")
+        node = transfer.node(response.url)
+        self.assertEqual(node.text, "Hello, World!")
+        self.assertEqual(transfer.size, 13)
+
+    def test_no_body(self):
+
+        async def session():
+            client = AsyncClient()
+            try:
+                empty = await client.open(f"{self.url}/empty", timeout=5)
+                async with asyncio.timeout(5):
+                    head = await client.send(("http", self.url.split("//")[1]), "HEAD", "/")
+                page = await client.open(f"{self.url}/", timeout=5)
+            finally:
+                await client.close()
+            return empty, head, page, client.stats
+
+        empty, head, page, stats = asyncio.run(session())
+        self.assertEqual((empty.status, empty.body), (204, b""))
+        self.assertEqual(head[0], 200)
+        self.assertEqual(head[-1], b"")
+        self.assertEqual(page.body.decode("utf8"), StoryHandler.pages["/"])
+        self.assertEqual(stats["connections"], 1, stats)
+        self.assertEqual(stats["reused"], 2, stats)
+
+    def test_max_size(self):
+
+        async def session():
+            scraper = AsyncScraper(max_size=128)
+            try:
+                await scraper.get(f"{self.url}/")
+            except ResponseTooLarge:
+                self.assertFalse(scraper.client.streams)
+            else:
+                self.fail("Expected ResponseTooLarge")
+
+            scraper.max_size = None
+            node = await scraper.get(f"{self.url}/session/1")
+            await scraper.client.close()
+            return node
+
+        node = asyncio.run(session())
+        self.assertEqual(node.text, StoryHandler.pages["/session/1"])
+        self.assertGreater(node.dns + node.connect, 0)
+        self.assertGreater(node.ttfb, 0)
+        self.assertGreaterEqual(node.elapsed, node.ttfb)
+
+    def test_http_error(self):
+
+        async def session():
+            client = AsyncClient()
+            try:
+                await client.open(f"{self.url}/missing")
+            finally:
+                await client.close()
+
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            asyncio.run(session())
+        self.assertEqual(context.exception.code, 404)
+
+    def test_stale_connection(self):
+
+        async def session():
+            client = AsyncClient()
+            await client.open(f"{self.url}/drop")
+            await asyncio.sleep(0.1)
+            response = await client.open(f"{self.url}/")
+            await client.close()
+            return client, response
+
+        client, response = asyncio.run(session())
+        self.assertTrue(response.body)
+        self.assertEqual(client.stats["connections"], 2, client.stats)
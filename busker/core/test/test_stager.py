@@ -17,8 +17,11 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import os
 import pprint
+import sys
 import textwrap
+import time
 import unittest
 import warnings
 
@@ -525,3 +528,227 @@ class StagerTests(unittest.TestCase):
             stager.active,
             [("busker", "b"), ("busker", "e")]
         )
+
+    def test_terminate_frozen(self):
+        with self.assertWarns(UserWarning):
+            data = list(Stager.load(*self.rules, frozen=True))
+
+        stager = Stager(data).prepare()
+        events = list(stager.terminate("busker", "a", "completion"))
+        self.assertEqual(events[0].targets, ("Condiment", "Artifact"))
+        self.assertEqual(events[0].payload, {"state": "spot.hall"})
+        self.assertIs(events[0].payload, data[0]["puzzles"][0]["events"][0]["payload"])
+        with self.assertRaises(TypeError):
+            events[0].payload["state"] = "spot.kitchen"
+
+        self.assertEqual(stager.active, [('busker.ext.zombie', 'a'), ('busker', 'b'), ('busker', 'e')])
+
+    def test_freeze(self):
+        rv = Stager.freeze({"a": [1, {"b": [2, 3]}], "c": "d"})
+        self.assertEqual(rv, {"a": (1, {"b": (2, 3)}), "c": "d"})
+        with self.assertRaises(TypeError):
+            rv["a"][1]["b"] = None
+
+    def test_terminate_many(self):
+        with self.assertWarns(UserWarning):
+            data = list(Stager.load(*self.rules))
+
+        stager = Stager(data).prepare()
+        events = list(stager.terminate_many([
+            ("busker.ext.zombie", "a", "completion"),
+            ("busker", "a", "completion"),
+        ]))
+        self.assertEqual(
+            [(i.realm, i.context, i.targets) for i in events],
+            [
+                ("busker.ext.zombie", "a", "c"),
+                ("busker", "a", ["Condiment", "Artifact"]),
+                ("busker", "a", "b"),
+                ("busker", "a", "e"),
+            ]
+        )
+        self.assertEqual(
+            stager.active,
+            [("busker.ext.zombie", "c"), ("busker.ext.zombie", "b"), ("busker", "b"), ("busker", "e")]
+        )
+
+        events = list(stager.terminate_many([
+            ("busker", "e", "defaulted"),
+            ("busker", "b", "completion"),
+        ]))
+        self.assertEqual([i.targets for i in events], ["f", "c"])
+        self.assertEqual(
+            stager.active,
+            [("busker.ext.zombie", "c"), ("busker.ext.zombie", "b"), ("busker", "f"), ("busker", "c")]
+        )
+
+    def test_terminate_many_dependent(self):
+        with self.assertWarns(UserWarning):
+            data = list(Stager.load(*self.rules))
+
+        batched = Stager(data).prepare()
+        events = list(batched.terminate_many([
+            ("busker", "a", "completion"),
+            ("busker", "b", "completion"),
+        ]))
+
+        single = Stager(data).prepare()
+        expected = list(single.terminate("busker", "a", "completion"))
+        expected.extend(single.terminate("busker", "b", "completion"))
+        self.assertEqual(events, expected)
+        self.assertEqual(sorted(batched.active), sorted(single.active))
+        self.assertEqual(batched.progress, single.progress)
+
+    def test_terminate_many_rejected(self):
+        with self.assertWarns(UserWarning):
+            data = list(Stager.load(*self.rules))
+
+        stager = Stager(data).prepare()
+        with self.assertRaises(ValueError):
+            list(stager.terminate_many([
+                ("busker", "a", "completion"),
+                ("busker", "g", "completion"),
+            ]))
+
+        # The verdict on a is kept, and the puzzles it made ready are active
+        self.assertIn(("busker", "b"), stager.active)
+        self.assertNotIn(("busker", "a"), stager.active)
+        list(stager.terminate("busker", "b", "completion"))
+        self.assertNotIn(("busker", "b"), stager.active)
+
+    def test_compiled(self):
+        with self.assertWarns(UserWarning):
+            data = list(Stager.load(*self.rules))
+
+        stager = Stager(data)
+        compiled = stager.compiled
+        self.assertEqual(set(compiled.puzzles), set(stager.puzzles))
+        self.assertEqual(compiled.critical, {"busker": 5, "busker.ext.zombie": 3})
+
+        levels = {puzzle: compiled.levels[n] for n, puzzle in enumerate(compiled.puzzles)}
+        self.assertEqual(levels[("busker", "a")], 0)
+        self.assertEqual(levels[("busker", "h")], 3)
+        self.assertEqual(levels[("busker", "g")], 4)
+        self.assertEqual(levels[("busker.ext.zombie", "z")], 0)
+
+        ancestors = compiled.ancestors[compiled.index[("busker", "d")]]
+        self.assertEqual(ancestors, stager.mask([("busker", p) for p in "abch"]))
+
+        self.assertEqual(
+            stager.horizon(1),
+            [
+                ("busker", "a"), ("busker", "b"), ("busker", "e"),
+                ("busker.ext.zombie", "a"), ("busker.ext.zombie", "c"), ("busker.ext.zombie", "b"),
+                ("busker.ext.zombie", "z"),
+            ]
+        )
+        done = stager.mask([("busker", "a"), ("busker", "b")])
+        self.assertEqual(
+            stager.horizon(0, done=done),
+            [("busker", "e"), ("busker", "c"), ("busker.ext.zombie", "a"), ("busker.ext.zombie", "z")]
+        )
+        self.assertIn(("busker", "d"), stager.horizon(2, done=done))
+        self.assertNotIn(("busker", "d"), stager.horizon(1, done=done))
+
+        stager.prepare()
+        self.assertEqual(stager.active, [("busker", "a"), ("busker.ext.zombie", "a")])
+
+    def test_progress_resume(self):
+        with self.assertWarns(UserWarning):
+            data = list(Stager.load(*self.rules))
+
+        stager = Stager(data).prepare()
+        list(stager.terminate("busker", "a", "completion"))
+        list(stager.terminate("busker", "b", "completion"))
+
+        progress = stager.progress
+        self.assertIsInstance(progress, bytes)
+        self.assertEqual(len(progress), 2 + 2 * len(stager.active))
+
+        template = Stager(data)
+        rv = template.resume(progress)
+        self.assertIsNot(rv, template)
+        self.assertEqual(rv.active, stager.active)
+        self.assertEqual(rv.progress, progress)
+
+        self.assertEqual(
+            [i.targets for i in rv.terminate("busker", "c", "completion")],
+            [i.targets for i in stager.terminate("busker", "c", "completion")],
+        )
+        self.assertEqual(rv.active, stager.active)
+        self.assertEqual(rv.progress, stager.progress)
+
+    def test_resume_invalid(self):
+        with self.assertWarns(UserWarning):
+            data = list(Stager.load(*self.rules))
+
+        stager = Stager(data).prepare()
+        self.assertRaises(ValueError, stager.resume, stager.progress + b"\x00")
+
+    def test_progress_too_many_puzzles(self):
+        with self.assertWarns(UserWarning):
+            data = list(Stager.load(*self.rules))
+
+        stager = Stager(data).prepare()
+        puzzles = stager.compiled.puzzles + [("busker", str(n)) for n in range(1 << 16)]
+        stager.compiled = stager.compiled._replace(puzzles=puzzles)
+        with self.assertRaises(ValueError):
+            stager.progress
+
+
+@unittest.skipUnless(os.environ.get("BUSKER_BENCHMARK"), "Set BUSKER_BENCHMARK to run benchmarks")
+class StagerBenchmarkTests(unittest.TestCase):
+
+    rule = textwrap.dedent("""
+    label = "Benchmark"
+    realm = "busker"
+
+    [[puzzles]]
+    name = "a"
+    init = {"Fruition" = "inception"}
+    chain = ["b"]
+
+    [[puzzles]]
+    name = "b"
+    """) + "".join(
+        textwrap.dedent(f"""
+        [[puzzles.events]]
+        trigger = "Fruition.completion"
+        targets = ["Condiment", "Artifact"]
+        payload = {{ state = "spot.hall", items = [{n}, {{ n = {n}, tags = ["a", "b", "c"] }}] }}
+        message = "Event number {n}"
+        """)
+        for n in range(64)
+    )
+
+    def terminate_rate(self, frozen: bool, period=0.2):
+        data = list(Stager.load(self.rule, frozen=frozen))
+        stager = Stager(data).prepare()
+        n = 0
+        end = time.perf_counter() + period
+        while time.perf_counter() < end:
+            events = list(stager.terminate("busker", "b", "completion", done=False))
+            n += 1
+        self.assertEqual(len(events), 64)
+        return n / period
+
+    def test_terminate_throughput(self):
+        copied = self.terminate_rate(frozen=False)
+        shared = self.terminate_rate(frozen=True)
+        print(f"Stager.terminate: {shared=:.0f}/s {copied=:.0f}/s", file=sys.stderr)
+
+    def test_resume_sessions(self, sessions=100_000):
+        data = list(Stager.load(self.rule))
+        template = Stager(data)
+
+        stager = Stager(data).prepare()
+        list(stager.terminate("busker", "a", "completion"))
+        progress = stager.progress
+
+        start = time.perf_counter()
+        for n in range(sessions):
+            stager = template.resume(progress)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(stager.active, [("busker", "b")])
+        print(f"Stager.resume: {sessions} sessions in {elapsed:.2f}s", file=sys.stderr)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+#   encoding: utf-8
+
+# This is part of the Busker library.
+# Copyright (C) 2024 D E Haynes
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import gc
+import hashlib
+import os
+import sys
+import tracemalloc
+import unittest
+
+from busker.core.scraper import Node
+from busker.core.scraper import Scraper
+from busker.core.scraper import PageCache
+from busker.core.test import test_scraper
+from busker.core.transcript import Transcript
+from busker.core.types import Choice
+
+
+class TranscriptTests(unittest.TestCase):
+
+    @staticmethod
+    def page(n: int, reply: bytes = None) -> Node:
+        reply = reply or test_scraper.ScraperTests.fixtures.Session.replace("Story", f"Story {n}").encode("utf8")
+        node = Node(
+            None, hashlib.blake2b(reply).hexdigest(),
+            url=f"http://localhost/session/{n}", text=reply.decode("utf8")
+        )
+        return Scraper(cache=PageCache()).extract(node)._replace(action="Write")
+
+    def test_round_trip(self):
+        transcript = Transcript()
+        pages = [self.page(n)._replace(dns=0.001 * n, connect=0.002 * n, ttfb=0.01, elapsed=0.02) for n in range(3)]
+        for n in range(12):
+            transcript.add(pages[n % 3], Choice("ballad-command-form", "ballad-command-form-input-text", str(n % 2)))
+
+        self.assertEqual(len(transcript), 12)
+        self.assertEqual(len(transcript.pages), 3)
+        for n, node in enumerate(transcript):
+            with self.subTest(n=n):
+                self.assertEqual(node, pages[n % 3])
+
+        self.assertEqual([i.value for i in transcript.choices()], ["0", "1"] * 6)
+
+    def test_interned_types(self):
+        transcript = Transcript()
+        transcript.add(self.page(0)._replace(options=("go", "north", "south")))
+        transcript.add(self.page(0), Choice("go", "north", "south"))
+
+        choice = list(transcript.choices())[-1]
+        self.assertIsInstance(choice, Choice)
+        self.assertEqual(choice.value, "south")
+        self.assertIs(type(transcript.pages[self.page(0).hash].options), tuple)
+
+    def test_interned_forms(self):
+        transcript = Transcript()
+        for n in range(3):
+            transcript.add(self.page(n))
+
+        forms = [page.forms for page in transcript.pages.values()]
+        self.assertIs(forms[0], forms[1])
+        self.assertIs(forms[1], forms[2])
+
+
+@unittest.skipUnless(os.environ.get("BUSKER_BENCHMARK"), "Set BUSKER_BENCHMARK to run benchmarks")
+class TranscriptBenchmarkTests(unittest.TestCase):
+
+    def allocated(self, turns: int, store, pages: int = 32):
+        replies = [
+            test_scraper.ScraperTests.fixtures.Session.replace("Story", f"Story {n}").encode("utf8")
+            for n in range(pages)
+        ]
+        nodes = [TranscriptTests.page(n, reply) for n, reply in enumerate(replies)]
+        choice = Choice("ballad-command-form", None, None)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            for n in range(turns):
+                # Each response is decoded afresh, as it would be from the network
+                node = nodes[n % pages]
+                store(node._replace(text=replies[n % pages].decode("utf8")), choice)
+            gc.collect()
+            rv, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return rv
+
+    def test_memory(self):
+        nodes = []
+        naive = self.allocated(1000, lambda node, choice: nodes.append((node, choice))) / 1000
+
+        transcript = Transcript()
+        compact = self.allocated(100_000, transcript.add)
+        self.assertEqual(len(transcript), 100_000)
+        self.assertEqual(len(transcript.pages), 32)
+
+        # Pages are stored once, so each turn costs no more than its own record
+        print(
+            f"Transcript: {compact / 100_000:.0f} bytes per turn, list of nodes: {naive:.0f} bytes per turn",
+            file=sys.stderr
+        )
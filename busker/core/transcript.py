@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+#   encoding: utf-8
+
+# This is part of the Busker library.
+# Copyright (C) 2024 D E Haynes
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from collections import namedtuple
+from collections.abc import Generator
+import datetime
+import json
+import sys
+import zlib
+
+from busker.core.scraper import Form
+from busker.core.scraper import Node
+from busker.core.types import Choice
+
+
+class Transcript:
+    """
+    A record of every turn in a session.
+
+    Each distinct page is stored once, keyed by its hash, with its text compressed.
+    Forms and inputs which recur between pages are shared rather than copied.
+
+    """
+
+    Page = namedtuple("Page", ["title", "blocks", "options", "forms", "text"])
+    Turn = namedtuple(
+        "Turn", ["ts", "hash", "action", "params", "url", "choice", "dns", "connect", "ttfb", "elapsed"]
+    )
+
+    def __init__(self, level: int = 6):
+        self.level = level
+        self.pages = {}
+        self.turns = []
+        self.interned = {}
+
+    def __len__(self):
+        return len(self.turns)
+
+    def __iter__(self):
+        return self.nodes()
+
+    def intern(self, obj):
+        if isinstance(obj, str):
+            return sys.intern(obj)
+        # A namedtuple equals a plain tuple of the same values, so each keeps its own type
+        return self.interned.setdefault((type(obj), obj), obj)
+
+    def intern_form(self, form: Form) -> Form:
+        inputs = tuple(
+            self.intern(i._replace(values=self.intern(tuple(self.intern(v) for v in i.values or ()))))
+            for i in form.inputs
+        )
+        return self.intern(form._replace(inputs=inputs))
+
+    def add(self, node: Node, choice: Choice = None):
+        if node.hash not in self.pages:
+            self.pages[node.hash] = self.Page(
+                title=node.title and self.intern(node.title),
+                blocks=zlib.compress(json.dumps(node.blocks or []).encode("utf8"), self.level),
+                options=self.intern(tuple(self.intern(i) for i in node.options or ())),
+                forms=self.intern(tuple(self.intern_form(i) for i in node.forms or ())),
+                text=zlib.compress((node.text or "").encode("utf8"), self.level),
+            )
+
+        self.turns.append(self.Turn(
+            ts=node.ts and node.ts.timestamp(),
+            hash=node.hash,
+            action=node.action and self.intern(node.action),
+            params=node.params and self.intern(node.params),
+            url=node.url and self.intern(node.url),
+            choice=choice and self.intern(choice),
+            dns=node.dns,
+            connect=node.connect,
+            ttfb=node.ttfb,
+            elapsed=node.elapsed,
+        ))
+
+    def node(self, n: int) -> Node:
+        turn = self.turns[n]
+        page = self.pages[turn.hash]
+        return Node(
+            ts=turn.ts and datetime.datetime.fromtimestamp(turn.ts, datetime.timezone.utc),
+            hash=turn.hash,
+            action=turn.action,
+            params=turn.params,
+            url=turn.url,
+            title=page.title,
+            blocks=tuple(json.loads(zlib.decompress(page.blocks))),
+            options=page.options,
+            forms=page.forms,
+            text=zlib.decompress(page.text).decode("utf8"),
+            dns=turn.dns,
+            connect=turn.connect,
+            ttfb=turn.ttfb,
+            elapsed=turn.elapsed,
+        )
+
+    def nodes(self) -> Generator[Node]:
+        for n in range(len(self.turns)):
+            yield self.node(n)
+
+    def choices(self) -> Generator[Choice]:
+        for turn in self.turns:
+            yield turn.choice
@@ -22,6 +22,7 @@ import asyncio
 from collections import Counter
 import logging
 import pathlib
+import random
 import tempfile
 import tomllib
 from types import SimpleNamespace
@@ -29,9 +30,18 @@ import sys
 
 import busker
 import busker.gui
-from busker.history import SharedHistory
-from busker.scraper import Scraper
-from busker.visitor import Visitor
+from busker.core.graph import Graph
+from busker.core.history import SharedHistory
+from busker.core.scraper import ConnectionPool
+from busker.plugins.automation import Automation
+from busker.plugins.executive import Executive
+from busker.plugins.loadgen import LoadGenerator
+from busker.plugins.replay import Recording
+from busker.plugins.replay import Replayer
+from busker.plugins.visitor import AsyncVisitor
+from busker.plugins.visitor import Strategy
+from busker.plugins.visitor import Visitor
+from busker.plugins.visitor import Witness
 
 
 defaults = SimpleNamespace(
@@ -43,14 +53,102 @@ def main(args):
     history = SharedHistory(log_name="busker")
     history.log(f"Busker {busker.__version__}")
 
+    if args.with_automation and args.replay:
+        recording = Recording.load(args.replay)
+        replayer = Replayer(recording, url=args.url, paced=args.paced)
+        replay = replayer.run(timeout=10)
+        history.log(f"{len(replay)} of {len(recording)} steps replayed.")
+        print(*recording.report(replay), sep="\n")
+        if args.record:
+            replay.save(args.record)
+        replayer.scraper.pool.close()
+        return 0
+
+    seed = random.randrange(1 << 32) if args.seed is None else args.seed
+    if args.with_automation:
+        history.log(f"Seed: {seed}")
+
+    if args.with_automation and args.rate:
+        phases = LoadGenerator.profile(args.rate, args.duration, args.ramp)
+        strategy = {i.name: i for i in Strategy.registry()}[args.strategy]()
+        generator = LoadGenerator(args.url, phases, concurrency=args.concurrency, strategy=strategy, seed=seed)
+        for report in asyncio.run(generator.run(timeout=10)):
+            print(
+                f"{report.phase:<10} target={report.target:.1f}/s",
+                f"throughput={report.throughput:.1f}/s",
+                f"requests={report.requests} errors={report.errors} error_rate={report.error_rate:.2%}",
+                f"lag p99={report.lag.percentile(99) * 1000:.2f}ms",
+            )
+        seeds = dict(sorted(generator.seeds.items()))
+        print(f"{seeds=}")
+        print(*history.latency.report(), sep="\n")
+        return 0
+
+    if args.with_automation and args.processes > 1:
+        executive = Executive(processes=args.processes)
+        runner = Automation(
+            args.url, args.number, shards=args.processes, concurrency=args.concurrency, seed=seed,
+            strategy=args.strategy,
+        )
+        try:
+            report = Automation.merge(*(job.get().data for job in executive.run(runner)))
+        finally:
+            executive.shutdown(executive.active)
+
+        history.log(f"{report['sessions']} sessions done.")
+        print(report["witness"].words)
+        print(f"duration={report['witness'].duration}")
+        print({k: report["turns"][k] for k in sorted(report["turns"].keys())})
+        seeds = dict(sorted(report["seeds"].items()))
+        print(f"{seeds=}")
+        print(*report["latency"].report(), sep="\n")
+        return 0
+
+    graph = Graph.load(args.graph) if args.graph else None
+    strategy = {i.name: i for i in Strategy.registry()}[args.strategy](graph=graph)
+    if args.with_automation and args.concurrency > 1:
+        visitors = asyncio.run(
+            AsyncVisitor.play(
+                args.url, args.number, args.concurrency, strategy=strategy, seed=seed, timeout=10
+            )
+        )
+        counter = Counter(visitor.turns for visitor in visitors)
+        witness = Witness().merge(*(visitor.witness for visitor in visitors))
+        stats = sum((visitor.scraper.client.stats for visitor in visitors), Counter())
+
+        history.log(f"{len(visitors)} sessions done.")
+        print(witness.words)
+        print({k: counter[k] for k in sorted(counter.keys())})
+        seeds = {visitor.seed: visitor.turns for visitor in visitors}
+        print(f"{seeds=}")
+        print(
+            f"{stats['requests']} requests on {stats['connections']} connections;",
+            f"{stats['reused']} reused a connection."
+        )
+        print(
+            f"{history.metrics['page_cache_hits']} pages of",
+            f"{history.metrics['page_cache_hits'] + history.metrics['page_cache_misses']} found in cache."
+        )
+        print(*history.latency.report(), sep="\n")
+        print(*strategy.report(), sep="\n")
+        if args.graph:
+            strategy.graph.save(args.graph)
+        return 0
+
     if args.with_automation:
         counter = Counter()
+        seeds = {}
+        pool = ConnectionPool()
 
         n = 0
         while n < args.number:
             n += 1
-            history.log(f"Run: {n:03d}")
-            visitor = Visitor(args.url)
+            visitor = Visitor(
+                args.url, pool=pool, strategy=strategy, seed=seed + n - 1,
+                # Only the last session is recorded
+                transcript=bool(args.record) and n == args.number,
+            )
+            history.log(f"Run: {n:03d} seed={visitor.seed}")
             while visitor.actions:
                 action = visitor.actions.popleft()
                 node = visitor(action, timeout=10)
@@ -58,6 +156,7 @@ def main(args):
                     history.log(f"Page: {node.title}")
 
             counter[visitor.turns] += 1
+            seeds[visitor.seed] = visitor.turns
 
         history.log(f"{visitor.turns} done.")
 
@@ -65,6 +164,22 @@ def main(args):
         print(visitor.witness.words)
         print(f"{visitor.witness.duration=}")
         print({k: counter[k] for k in sorted(counter.keys())})
+        print(f"{seeds=}")
+        print(
+            f"{pool.stats['requests']} requests on {pool.stats['connections']} connections;",
+            f"{pool.stats['reused']} reused a connection."
+        )
+        print(
+            f"{history.metrics['page_cache_hits']} pages of",
+            f"{history.metrics['page_cache_hits'] + history.metrics['page_cache_misses']} found in cache."
+        )
+        print(*history.latency.report(), sep="\n")
+        print(*strategy.report(), sep="\n")
+        if args.graph:
+            strategy.graph.save(args.graph)
+        if args.record:
+            Recording.from_transcript(visitor.transcript).save(args.record)
+        pool.close()
         visitor.witness.reset()
         return 0
 
@@ -113,6 +228,54 @@ def parser(defaults):
         "--number", type=int, default="64",
         help="Set the number of times to run the plugin."
     )
+    automation_options.add_argument(
+        "--concurrency", type=int, default=1,
+        help="Set the number of sessions to run at once [1]."
+    )
+    automation_options.add_argument(
+        "--processes", type=int, default=1,
+        help="Set the number of worker processes which share the sessions [1]."
+    )
+    automation_options.add_argument(
+        "--seed", type=int, default=None,
+        help="Set the seed of the first session; those which follow take the next seeds in turn. "
+        "Give the seed of a session with --number 1 to play it again."
+    )
+    automation_options.add_argument(
+        "--rate", type=float, default=0,
+        help="Generate load at this target number of requests per second."
+    )
+    automation_options.add_argument(
+        "--duration", type=float, default=60,
+        help="Set the number of seconds to hold the target rate of load [60]."
+    )
+    automation_options.add_argument(
+        "--ramp", type=float, default=0,
+        help="Set the number of seconds to ramp load up and down [0]."
+    )
+    automation_options.add_argument(
+        "--strategy", choices=[i.name for i in Strategy.registry()], default="random",
+        help="Set the strategy by which sessions choose their commands [random]."
+    )
+    automation_options.add_argument(
+        "--graph", type=pathlib.Path, default=None,
+        help="Set a path to a file which keeps the exploration graph between runs. "
+        "Not supported with --rate or --processes."
+    )
+    automation_options.add_argument(
+        "--record", type=pathlib.Path, default=None,
+        help="Save the last session, or the replay, to this file. "
+        "Not supported with --rate, --processes or --concurrency."
+    )
+    automation_options.add_argument(
+        "--replay", type=pathlib.Path, default=None,
+        help="Replay a recorded session and compare the time taken by each step. "
+        "Requires --with-automation."
+    )
+    automation_options.add_argument(
+        "--paced", action="store_true", default=False,
+        help="Replay steps at their original pace rather than as fast as possible [False]."
+    )
     return rv
 
 
@@ -126,6 +289,12 @@ def run():
     )
     p = parser(defaults)
     args = p.parse_args()
+    if args.replay and not args.with_automation:
+        p.error("--replay requires --with-automation")
+    if not args.replay and (args.rate or args.processes > 1) and args.graph:
+        p.error("--rate and --processes do not support --graph")
+    if not args.replay and (args.rate or args.processes > 1 or args.concurrency > 1) and args.record:
+        p.error("--rate, --processes and --concurrency do not support --record")
     rv = main(args)
     sys.exit(rv)
 
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+#   encoding: utf-8
+
+# This is part of the Busker library.
+# Copyright (C) 2024 D E Haynes
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import contextlib
+import io
+import unittest
+import unittest.mock
+
+from busker.gui.main import run
+
+
+class MainTests(unittest.TestCase):
+
+    def test_options(self):
+        for args, message in (
+            (["--replay", "session.jsonl"], "--with-automation"),
+            (["--with-automation", "--rate", "5", "--graph", "graph.json"], "--graph"),
+            (["--with-automation", "--processes", "2", "--record", "session.jsonl"], "--record"),
+            (["--with-automation", "--concurrency", "4", "--record", "session.jsonl"], "--record"),
+        ):
+            with self.subTest(args=args):
+                with (
+                    unittest.mock.patch("sys.argv", ["busker", *args]),
+                    contextlib.redirect_stderr(io.StringIO()) as err,
+                    self.assertRaises(SystemExit) as context,
+                ):
+                    run()
+                self.assertEqual(context.exception.code, 2)
+                self.assertIn(message, err.getvalue())
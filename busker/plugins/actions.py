@@ -19,9 +19,10 @@
 
 import urllib.parse
 
-from busker.scraper import Scraper
-from busker.scraper import Node
-from busker.types import Choice
+from busker.core.scraper import AsyncScraper
+from busker.core.scraper import Scraper
+from busker.core.scraper import Node
+from busker.core.types import Choice
 
 
 class Action:
@@ -35,62 +36,52 @@ class Action:
         self.url = url
         self.choice = choice
 
+    def extract(self, scraper: Scraper, node: Node, **kwargs) -> Node:
+        scraper.latency.record(self.__class__.__name__, self.url or node.url, node)
+        return scraper.extract(node)._replace(
+            action=self.__class__.__name__,
+            params=tuple(kwargs.items()),
+        )
+
     def run(self, scraper: Scraper, **kwargs) -> Node:
         return Node(None, None)
 
+    async def run_async(self, scraper: AsyncScraper, **kwargs) -> Node:
+        return Node(None, None)
+
 
 class Read(Action):
     def run(self, scraper: Scraper, **kwargs) -> Node:
         url = self.prior.url if self.prior else self.url
         node = scraper.get(url, **kwargs)
+        return self.extract(scraper, node, **kwargs)
 
-        body_re = scraper.tag_matcher("body")
-        body_match = body_re.search(node.text)
-
-        title_match = scraper.find_title(node.text)
-        forms = body_match and tuple(scraper.get_forms(body_match[0])) or tuple()
-        blocks = body_match and tuple(scraper.find_blocks(body_match[0])) or tuple()
-
-        return node._replace(
-            action=self.__class__.__name__,
-            params=tuple(kwargs.items()),
-            title=title_match and title_match.group(),
-            blocks=blocks,
-            options=tuple(v for f in forms for i in f.inputs for v in i.values),
-            forms=forms,
-        )
-        return node
+    async def run_async(self, scraper: AsyncScraper, **kwargs) -> Node:
+        url = self.prior.url if self.prior else self.url
+        node = await scraper.get(url, **kwargs)
+        return self.extract(scraper, node, **kwargs)
 
 
 class Write(Action):
-    def run(self, scraper: Scraper, **kwargs) -> Node:
+
+    def request(self) -> tuple[str, dict] | None:
         form = {i.name: i for i in self.prior.forms}.get(self.choice.form, next(iter(self.prior.forms)))
         if form and form.method.lower() == "post":
-            parts = urllib.parse.urlparse(form.action)
-            if not parts.scheme:
-                parts = urllib.parse.urlparse(f"{self.prior.url}{form.action}")
-            self.url = urllib.parse.urlunparse(parts)
+            self.url = urllib.parse.urljoin(self.prior.url, form.action)
 
             if self.choice.input is None:
                 data = dict()
             else:
                 input_ = {i.name: i for i in form.inputs}.get(self.choice.input, next(iter(form.inputs)))
                 data = {input_.name: self.choice.value}
+            return self.url, data
 
-            rv = scraper.post(self.url, data)
-
-            body_re = scraper.tag_matcher("body")
-            body_match = body_re.search(rv.text)
-
-            forms = body_match and tuple(scraper.get_forms(body_match[0])) or tuple()
-            blocks = body_match and tuple(scraper.find_blocks(body_match[0])) or tuple()
-
-            rv = rv._replace(
-                action=self.__class__.__name__,
-                params=tuple(kwargs.items()),
-                title = scraper.find_title(rv.text),
-                blocks=blocks,
-                options=tuple(v for f in forms for i in f.inputs for v in i.values),
-                forms=forms,
-            )
-            return rv
+    def run(self, scraper: Scraper, **kwargs) -> Node:
+        if request := self.request():
+            rv = scraper.post(*request)
+            return self.extract(scraper, rv, **kwargs)
+
+    async def run_async(self, scraper: AsyncScraper, **kwargs) -> Node:
+        if request := self.request():
+            rv = await scraper.post(*request)
+            return self.extract(scraper, rv, **kwargs)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+#   encoding: utf-8
+
+# This is part of the Busker library.
+# Copyright (C) 2024 D E Haynes
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from collections import Counter
+import asyncio
+import functools
+import os
+
+from busker.core.history import SharedHistory
+from busker.core.metrics import Latency
+from busker.core.runner import Runner
+from busker.core.types import Completion
+from busker.core.types import ExecutionEnvironment
+from busker.plugins.visitor import AsyncVisitor
+from busker.plugins.visitor import Strategy
+from busker.plugins.visitor import Witness
+
+
+class Automation(Runner):
+    """
+    Plays automated sessions in the worker processes of an Executive.
+    The sessions are divided into one shard per job,
+    and the summary of each shard is merged into a single report.
+    Witness statistics travel between processes as plain state.
+    A strategy is named rather than shared, so each shard makes its own.
+
+    """
+
+    def __init__(
+        self, url: str, number: int,
+        shards: int = None, concurrency: int = 1, timeout: float = 10, seed: int = None,
+        strategy: str = "random",
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.url = url
+        self.number = number
+        self.shards = shards or os.cpu_count() or 1
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.seed = seed
+        self.strategy = strategy
+
+    @property
+    def jobs(self) -> list:
+        return [functools.partial(self.play, shard=n) for n in range(self.shards)]
+
+    def sessions(self, shard: int) -> int:
+        return self.number // self.shards + int(shard < self.number % self.shards)
+
+    def first_seed(self, shard: int) -> int:
+        """
+        Seeds follow on from one shard to the next, so that each session
+        has the same seed however many shards there are.
+
+        """
+        if self.seed is not None:
+            return self.seed + sum(self.sessions(n) for n in range(shard))
+
+    def play(self, exenv: ExecutionEnvironment, shard: int = 0, **kwargs) -> Completion:
+        # A worker process may play more than one shard
+        SharedHistory.history["latency"] = Latency()
+        strategy = {i.name: i for i in Strategy.registry()}[self.strategy]()
+        visitors = asyncio.run(
+            AsyncVisitor.play(
+                self.url, self.sessions(shard), self.concurrency,
+                strategy=strategy, seed=self.first_seed(shard), timeout=self.timeout
+            )
+        )
+        return Completion(self, exenv, self.summary(visitors))
+
+    @staticmethod
+    def summary(visitors: list[AsyncVisitor]) -> dict:
+        return dict(
+            sessions=len(visitors),
+            seeds={visitor.seed: visitor.turns for visitor in visitors},
+            witness=Witness().merge(*(visitor.witness for visitor in visitors)).state,
+            turns=Counter(visitor.turns for visitor in visitors),
+            durations=[visitor.witness.duration for visitor in visitors],
+            latency=SharedHistory.history["latency"],
+        )
+
+    @staticmethod
+    def merge(*summaries: tuple[dict]) -> dict:
+        rv = dict(sessions=0, seeds={}, witness=Witness(), turns=Counter(), durations=[], latency=Latency())
+        for summary in summaries:
+            rv["sessions"] += summary["sessions"]
+            rv["seeds"].update(summary["seeds"])
+            rv["witness"].merge(Witness.from_state(summary["witness"]))
+            rv["turns"].update(summary["turns"])
+            rv["durations"].extend(summary["durations"])
+            rv["latency"].merge(summary["latency"])
+        return rv
@@ -117,6 +117,7 @@ class Executive(SharedHistory):
         exenv = self.build(sys.executable)
         self.activate(
             exenv,
+            processes=processes, maxtasksperchild=maxtasksperchild,
             initializer=self.initializer,
             **kwargs
         )
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+#   encoding: utf-8
+
+# This is part of the Busker library.
+# Copyright (C) 2024 D E Haynes
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from collections import Counter
+from collections import namedtuple
+from collections.abc import Generator
+import asyncio
+import logging
+import math
+import random
+
+from busker.core.history import SharedHistory
+from busker.core.metrics import Histogram
+from busker.plugins.visitor import AsyncVisitor
+from busker.plugins.visitor import Strategy
+
+
+class LoadGenerator(SharedHistory):
+    """
+    Drives concurrent sessions at a target rate of requests per second.
+
+    The generator is open-loop: requests are scheduled by the clock,
+    not by the completion of earlier ones.
+    When every session is busy, scheduled requests wait,
+    and the delay before each one starts is recorded as lag.
+
+    Each new session takes the next seed in turn from `seed`.
+    The turns of every session which sends a request are kept by seed in `seeds`.
+
+    """
+
+    Phase = namedtuple("Phase", ["name", "duration", "start", "end"])
+    Report = namedtuple(
+        "Report",
+        ["phase", "duration", "target", "requests", "errors", "throughput", "error_rate", "lag"]
+    )
+
+    @classmethod
+    def profile(cls, rate: float, duration: float, ramp: float = 0) -> list[Phase]:
+        rv = [cls.Phase("steady", duration, rate, rate)]
+        if ramp:
+            rv.insert(0, cls.Phase("ramp-up", ramp, 0, rate))
+            rv.append(cls.Phase("ramp-down", ramp, rate, 0))
+        return rv
+
+    @staticmethod
+    def arrivals(phase: Phase) -> Generator[float]:
+        """
+        Generate the offset of each request from the start of a phase.
+        The rate changes linearly over the phase, so the k-th request
+        is due when the integral of the rate reaches k.
+
+        """
+        slope = (phase.end - phase.start) / phase.duration if phase.duration else 0
+        k = 1
+        while True:
+            if slope:
+                discriminant = phase.start ** 2 + 2 * slope * k
+                if discriminant < 0:
+                    return
+                t = (math.sqrt(discriminant) - phase.start) / slope
+            elif phase.start:
+                t = k / phase.start
+            else:
+                return
+
+            if t > phase.duration:
+                return
+            yield t
+            k += 1
+
+    def __init__(
+        self, url: str, phases: list[Phase], concurrency: int = 64, visitor=AsyncVisitor,
+        strategy: Strategy = None, seed: int = None,
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.url = url
+        self.phases = phases
+        self.concurrency = concurrency
+        self.visitor = visitor
+        self.strategy = strategy
+        self.seed = random.randrange(1 << 32) if seed is None else seed
+        self.sessions = 0
+        self.seeds = {}
+        self.counters = [Counter() for phase in phases]
+        self.lags = [Histogram() for phase in phases]
+
+    def session(self) -> AsyncVisitor:
+        self.sessions += 1
+        return self.visitor(self.url, strategy=self.strategy, seed=self.seed + self.sessions - 1)
+
+    async def dispatch(self, tokens: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        for n, phase in enumerate(self.phases):
+            self.log(f"Phase: {phase.name}")
+            start = loop.time()
+            for offset in self.arrivals(phase):
+                due = start + offset
+                await asyncio.sleep(max(0, due - loop.time()))
+                self.counters[n]["scheduled"] += 1
+                tokens.put_nowait((n, due))
+            await asyncio.sleep(max(0, start + phase.duration - loop.time()))
+
+        for i in range(self.concurrency):
+            tokens.put_nowait(None)
+
+    async def work(self, tokens: asyncio.Queue, **kwargs):
+        loop = asyncio.get_running_loop()
+        visitor = self.session()
+        while (token := await tokens.get()) is not None:
+            n, due = token
+            self.lags[n].record(loop.time() - due)
+
+            action = visitor.actions.popleft()
+            try:
+                node = await visitor(action, **kwargs)
+            except Exception as e:
+                # A server failing under load ends one session, not the run
+                self.log(f"Session {visitor.seed} stopped by {e!r}", level=logging.WARNING)
+                node = None
+
+            self.counters[n]["requests"] += 1
+            if node is None:
+                self.counters[n]["errors"] += 1
+
+            self.seeds[visitor.seed] = visitor.turns
+            if node is None or not visitor.actions:
+                # Begin a new session
+                await visitor.close()
+                visitor = self.session()
+
+        await visitor.close()
+
+    async def run(self, **kwargs) -> list[Report]:
+        tokens = asyncio.Queue()
+        await asyncio.gather(
+            self.dispatch(tokens),
+            *(self.work(tokens, **kwargs) for i in range(self.concurrency)),
+        )
+        return self.reports()
+
+    def reports(self) -> list[Report]:
+        return [
+            self.Report(
+                phase=phase.name,
+                duration=phase.duration,
+                target=(phase.start + phase.end) / 2,
+                requests=counter["requests"],
+                errors=counter["errors"],
+                throughput=counter["requests"] / phase.duration if phase.duration else 0,
+                error_rate=counter["errors"] / counter["requests"] if counter["requests"] else 0,
+                lag=lag,
+            )
+            for phase, counter, lag in zip(self.phases, self.counters, self.lags)
+        ]
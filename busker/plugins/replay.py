@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+#   encoding: utf-8
+
+# This is part of the Busker library.
+# Copyright (C) 2024 D E Haynes
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from collections import namedtuple
+from collections.abc import Generator
+import gzip
+import json
+import logging
+import pathlib
+import time
+import typing
+import urllib.error
+import urllib.parse
+
+from busker.core.history import SharedHistory
+from busker.core.metrics import Latency
+from busker.core.scraper import ConnectionPool
+from busker.core.scraper import ResponseTooLarge
+from busker.core.scraper import Scraper
+from busker.core.transcript import Transcript
+from busker.core.types import Choice
+from busker.plugins.actions import Action
+from busker.plugins.actions import Read
+from busker.plugins.actions import Write
+
+
+class Recording:
+    """
+    The actions of a session, with the Choice and timing of each.
+
+    A Recording is saved as JSON Lines, one list per step,
+    and compressed if the file name ends in `.gz`.
+
+    """
+
+    Step = namedtuple("Step", ["action", "url", "choice", "offset", "ttfb", "elapsed"])
+    Delta = namedtuple("Delta", ["step", "action", "url", "before", "after", "delta"])
+
+    @classmethod
+    def from_transcript(cls, transcript: Transcript) -> typing.Self:
+        rv = cls()
+        start = None
+        for turn in transcript.turns:
+            began = turn.ts and turn.ts - (turn.elapsed or 0)
+            if start is None:
+                start = began
+            rv.steps.append(cls.Step(
+                action=turn.action,
+                url=turn.url,
+                choice=turn.choice,
+                offset=began and began - start,
+                ttfb=turn.ttfb,
+                elapsed=turn.elapsed,
+            ))
+        return rv
+
+    @staticmethod
+    def open(path: pathlib.Path, mode: str = "r"):
+        if path.suffix == ".gz":
+            return gzip.open(path, mode + "t", encoding="utf8")
+        return path.open(mode, encoding="utf8")
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> typing.Self:
+        rv = cls()
+        with cls.open(path) as lines:
+            for line in lines:
+                action, url, choice, offset, ttfb, elapsed = json.loads(line)
+                rv.steps.append(cls.Step(action, url, choice and Choice(*choice), offset, ttfb, elapsed))
+        return rv
+
+    def __init__(self, steps: list[Step] = None):
+        self.steps = steps or []
+
+    def __len__(self):
+        return len(self.steps)
+
+    def save(self, path: pathlib.Path):
+        with self.open(path, "w") as output:
+            for step in self.steps:
+                print(json.dumps(step, separators=(",", ":")), file=output)
+
+    def compare(self, other: typing.Self) -> list[Delta]:
+        """
+        Compare the time taken by each step of this Recording with the same step of another.
+
+        """
+        return [
+            self.Delta(
+                step=n,
+                action=a.action,
+                url=Latency.template(a.url or ""),
+                before=a.elapsed,
+                after=b.elapsed,
+                delta=None if None in (a.elapsed, b.elapsed) else b.elapsed - a.elapsed,
+            )
+            for n, (a, b) in enumerate(zip(self.steps, other.steps))
+        ]
+
+    def report(self, other: typing.Self) -> Generator[str]:
+        for delta in self.compare(other):
+            yield (
+                f"{delta.step:>4} {delta.action:<8} {delta.url:<32}"
+                f" before={(delta.before or 0) * 1000:.2f}ms after={(delta.after or 0) * 1000:.2f}ms"
+                + (f" delta={delta.delta * 1000:+.2f}ms" if delta.delta is not None else "")
+            )
+
+
+class Replayer(SharedHistory):
+    """
+    Plays the steps of a Recording against a server.
+
+    Each Write posts the recorded Choice to the matching form of the page
+    it follows, so identifiers in a new session are respected.
+    Steps are sent as fast as possible, or at their original pace if `paced`.
+    A Read may be sent to a different server by giving its `url`.
+
+    """
+
+    def __init__(self, recording: Recording, url: str = None, paced: bool = False, pool=None, **kwargs):
+        super().__init__(**kwargs)
+        self.recording = recording
+        self.url = url
+        self.paced = paced
+        self.scraper = Scraper(pool=pool or ConnectionPool())
+        self.transcript = Transcript()
+
+    def action(self, step: Recording.Step, node) -> Action:
+        if step.action == "Read" or node is None:
+            url = step.url
+            if self.url:
+                parts = urllib.parse.urlsplit(step.url)
+                url = urllib.parse.urljoin(self.url, urllib.parse.urlunsplit(("", "", *parts[2:])))
+            return Read(url=url)
+        return Write(node, choice=step.choice)
+
+    def run(self, **kwargs) -> Recording:
+        node = None
+        start = time.monotonic()
+        for n, step in enumerate(self.recording.steps):
+            if self.paced and step.offset:
+                time.sleep(max(0, start + step.offset - time.monotonic()))
+
+            action = self.action(step, node)
+            try:
+                node = action.run(self.scraper, **kwargs)
+            except (urllib.error.HTTPError, ResponseTooLarge) as e:
+                self.log(f"Replay stopped at step {n}: {e}", level=logging.WARNING)
+                break
+            if node is None:
+                self.log(f"Replay stopped at step {n}: no form to submit", level=logging.WARNING)
+                break
+            self.transcript.add(node, action.choice)
+
+        return Recording.from_transcript(self.transcript)
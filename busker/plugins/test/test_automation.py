@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+#   encoding: utf-8
+
+# This is part of the Busker library.
+# Copyright (C) 2024 D E Haynes
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from collections import Counter
+import unittest
+from unittest.mock import patch
+
+from busker.core.metrics import Latency
+from busker.core.scraper import Node
+from busker.core.test import test_scraper
+from busker.plugins.automation import Automation
+from busker.plugins.executive import Executive
+from busker.plugins.test import test_loadgen
+from busker.plugins.visitor import CoverageStrategy
+from busker.plugins.visitor import Witness
+
+
+class AutomationTests(unittest.TestCase):
+
+    def test_sessions(self):
+        runner = Automation("http://localhost:8080", 10, shards=3)
+        self.assertEqual(len(runner.jobs), 3)
+        self.assertEqual([runner.sessions(n) for n in range(3)], [4, 3, 3])
+
+    def test_first_seed(self):
+        runner = Automation("http://localhost:8080", 10, shards=3)
+        self.assertIsNone(runner.first_seed(1))
+
+        runner = Automation("http://localhost:8080", 10, shards=3, seed=100)
+        self.assertEqual([runner.first_seed(n) for n in range(3)], [100, 104, 107])
+
+    def test_merge(self):
+        summaries = []
+        for n in range(2):
+            latency = Latency()
+            latency.record("Read", "http://localhost/", Node(None, None, ttfb=0.01 * (n + 1)))
+            witness = Witness()
+            witness.words.update(goal=n + 1)
+            witness.duration = 4
+            summaries.append(dict(
+                sessions=2,
+                seeds={2 * n: n + 3, 2 * n + 1: n + 3},
+                witness=witness.state,
+                turns=Counter({n + 3: 2}),
+                durations=[1.5, 2.5],
+                latency=latency,
+            ))
+
+        rv = Automation.merge(*summaries)
+        self.assertEqual(rv["sessions"], 4)
+        self.assertEqual(rv["seeds"], {0: 3, 1: 3, 2: 4, 3: 4})
+        self.assertEqual(rv["witness"].words, Counter(goal=3))
+        self.assertEqual(rv["witness"].duration, 8)
+        self.assertEqual(rv["turns"], Counter({3: 2, 4: 2}))
+        self.assertEqual(rv["durations"], [1.5, 2.5, 1.5, 2.5])
+        self.assertEqual(rv["latency"].histograms[("Read", "/", "ttfb")].total, 2)
+
+
+class EndingHandler(test_loadgen.CommandHandler):
+
+    def do_POST(self):
+        if self.path == "/sessions":
+            return super().do_POST()
+
+        # The story ends after the first command
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.reply(404, "The End")
+
+
+class ShardTests(test_scraper.ServerTests):
+
+    handler = EndingHandler
+
+    def test_shards(self):
+        executive = Executive(processes=2)
+        runner = Automation(self.url, 5, shards=2, concurrency=2, timeout=2, seed=10)
+        try:
+            completions = [job.get(timeout=30) for job in executive.run(runner)]
+        finally:
+            executive.shutdown(executive.active)
+
+        self.assertEqual(len(completions), 2)
+        report = Automation.merge(*(i.data for i in completions))
+        self.assertEqual(report["sessions"], 5)
+        self.assertEqual(sorted(report["seeds"]), list(range(10, 15)))
+        self.assertEqual(len(report["durations"]), 5)
+        self.assertEqual(report["turns"], Counter({1: 5}))
+        self.assertTrue(report["witness"].words)
+        self.assertEqual(report["witness"].turns, 5)
+        self.assertTrue(report["latency"].histograms)
+
+    def test_strategy(self):
+        runner = Automation(self.url, 2, shards=1, concurrency=2, timeout=2, seed=10, strategy="coverage")
+        with patch.object(CoverageStrategy, "choose", autospec=True, side_effect=CoverageStrategy.choose) as choose:
+            completion = runner.play(None)
+
+        self.assertEqual(completion.data["sessions"], 2)
+
+        # Each session chooses at least its first command
+        self.assertGreaterEqual(choose.call_count, 2)
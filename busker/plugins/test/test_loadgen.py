@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+#   encoding: utf-8
+
+# This is part of the Busker library.
+# Copyright (C) 2024 D E Haynes
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from busker.core.test import test_scraper
+from busker.plugins.loadgen import LoadGenerator
+from busker.plugins.visitor import AsyncVisitor
+
+
+class LoadGeneratorTests(unittest.TestCase):
+
+    def test_profile(self):
+        phases = LoadGenerator.profile(10, 60)
+        self.assertEqual([i.name for i in phases], ["steady"])
+
+        phases = LoadGenerator.profile(10, 60, ramp=5)
+        self.assertEqual([i.name for i in phases], ["ramp-up", "steady", "ramp-down"])
+        self.assertEqual((phases[0].start, phases[0].end), (0, 10))
+        self.assertEqual((phases[-1].start, phases[-1].end), (10, 0))
+
+    def test_arrivals(self):
+        steady, = LoadGenerator.profile(10, 2)
+        rv = list(LoadGenerator.arrivals(steady))
+        self.assertEqual(len(rv), 20)
+        self.assertAlmostEqual(rv[0], 0.1)
+        self.assertAlmostEqual(rv[-1], 2.0)
+
+        up, steady, down = LoadGenerator.profile(100, 1, ramp=2)
+        for phase in (up, down):
+            with self.subTest(phase=phase):
+                rv = list(LoadGenerator.arrivals(phase))
+                self.assertEqual(rv, sorted(rv))
+                self.assertAlmostEqual(len(rv), 100, delta=1)
+
+        # Ramping up, requests bunch toward the end of the phase
+        rv = list(LoadGenerator.arrivals(up))
+        self.assertLess(len([t for t in rv if t < 1]), len([t for t in rv if t >= 1]))
+
+    def test_idle(self):
+        phase = LoadGenerator.Phase("idle", 1, 0, 0)
+        self.assertFalse(list(LoadGenerator.arrivals(phase)))
+
+
+class CommandHandler(test_scraper.StoryHandler):
+
+    pages = {
+        "/": test_scraper.ScraperTests.fixtures.Home,
+        "/session/1": test_scraper.ScraperTests.fixtures.Session.replace(
+            "http://localhost:8080/session/79453e2d-d200-44f5-84b1-7dde4f25fc90", "/session/1"
+        ),
+    }
+
+
+class LoadTests(test_scraper.ServerTests):
+
+    handler = CommandHandler
+
+    def test_run(self):
+        phases = LoadGenerator.profile(50, 0.4, ramp=0.2)
+        generator = LoadGenerator(self.url, phases, concurrency=4)
+        reports = asyncio.run(generator.run(timeout=2))
+
+        self.assertEqual([i.phase for i in reports], ["ramp-up", "steady", "ramp-down"])
+        self.assertEqual([i.requests for i in reports], [5, 20, 5])
+        self.assertEqual(sum(i.errors for i in reports), 0)
+        self.assertAlmostEqual(reports[1].throughput, 50)
+        self.assertTrue(all(len(i.lag) == i.requests for i in reports))
+
+    def test_errors(self):
+        phases = LoadGenerator.profile(50, 0.2)
+        generator = LoadGenerator(f"{self.url}/missing", phases, concurrency=2, seed=100)
+        report, = asyncio.run(generator.run(timeout=2))
+        self.assertEqual(report.requests, 10)
+        self.assertEqual(report.error_rate, 1)
+
+        # Each failed request ends its session, which the next seed replaces
+        self.assertEqual(sorted(generator.seeds), list(range(generator.seed, generator.seed + 10)))
+
+    def test_unexpected_errors(self):
+        phases = LoadGenerator.profile(50, 0.2)
+        generator = LoadGenerator(self.url, phases, concurrency=2, seed=100)
+        with patch.object(AsyncVisitor, "choose", side_effect=IndexError("Cannot choose from an empty sequence")):
+            report, = asyncio.run(generator.run(timeout=2))
+
+        self.assertEqual(report.requests, 10)
+        self.assertEqual(report.error_rate, 1)
+        self.assertEqual(len(generator.seeds), 10)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+#   encoding: utf-8
+
+# This is part of the Busker library.
+# Copyright (C) 2024 D E Haynes
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import datetime
+import pathlib
+import tempfile
+import time
+import unittest
+
+from busker.core.scraper import Node
+from busker.core.test import test_scraper
+from busker.core.transcript import Transcript
+from busker.core.types import Choice
+from busker.plugins.replay import Recording
+from busker.plugins.replay import Replayer
+from busker.plugins.test import test_loadgen
+
+
+class RecordingTests(unittest.TestCase):
+
+    @staticmethod
+    def recording(url: str = "http://localhost/", step: float = 0) -> Recording:
+        return Recording([
+            Recording.Step("Read", url, None, 0, 0.001, 0.002),
+            Recording.Step("Write", url + "session/1", Choice("ballad-form-start"), step, 0.001, 0.002),
+        ] + [
+            Recording.Step(
+                "Write", url + "session/1",
+                Choice("ballad-command-form", "ballad-command-form-input-text", value),
+                step * n, 0.001, 0.002
+            )
+            for n, value in enumerate(["yes", "no", "info"], start=2)
+        ])
+
+    def test_from_transcript(self):
+        transcript = Transcript()
+        start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+        for n, choice in enumerate([None, Choice("ballad-form-start")]):
+            transcript.add(
+                Node(
+                    start + datetime.timedelta(seconds=n + 0.5), f"{n:016x}",
+                    action="Write" if choice else "Read", url=f"http://localhost/{n}", elapsed=0.5
+                ),
+                choice
+            )
+
+        rv = Recording.from_transcript(transcript)
+        self.assertEqual([i.action for i in rv.steps], ["Read", "Write"])
+        self.assertEqual([i.offset for i in rv.steps], [0, 1])
+        self.assertEqual(rv.steps[1].choice, Choice("ballad-form-start"))
+
+    def test_save(self):
+        recording = self.recording()
+        with tempfile.TemporaryDirectory() as parent:
+            for name in ("session.jsonl", "session.jsonl.gz"):
+                with self.subTest(name=name):
+                    path = pathlib.Path(parent).joinpath(name)
+                    recording.save(path)
+                    rv = Recording.load(path)
+                    self.assertEqual(rv.steps, recording.steps)
+
+    def test_compare(self):
+        a = self.recording()
+        b = Recording([i._replace(elapsed=0.003) for i in a.steps[:-1]])
+        rv = a.compare(b)
+        self.assertEqual(len(rv), 4)
+        self.assertEqual(rv[1].url, "/session/{id}")
+        self.assertTrue(all(abs(i.delta - 0.001) < 1e-9 for i in rv))
+        self.assertEqual(len(list(a.report(b))), 4)
+
+
+class ReplayTests(test_scraper.ServerTests):
+
+    handler = test_loadgen.CommandHandler
+
+    def test_replay(self):
+        recording = RecordingTests.recording(url="http://localhost:8080/")
+        replayer = Replayer(recording, url=self.url)
+        rv = replayer.run(timeout=2)
+        replayer.scraper.pool.close()
+
+        self.assertEqual(len(rv), len(recording))
+        self.assertEqual([i.choice for i in rv.steps], [i.choice for i in recording.steps])
+        self.assertTrue(rv.steps[0].url.startswith(self.url))
+        self.assertTrue(all(i.delta is not None for i in recording.compare(rv)))
+
+    def test_paced(self):
+        recording = RecordingTests.recording(url=self.url, step=0.05)
+        replayer = Replayer(recording, paced=True)
+        start = time.monotonic()
+        rv = replayer.run(timeout=2)
+        replayer.scraper.pool.close()
+
+        self.assertEqual(len(rv), len(recording))
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+        self.assertGreaterEqual(rv.steps[-1].offset, 0.2 - 0.01)
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+#   encoding: utf-8
+
+# This is part of the Busker library.
+# Copyright (C) 2024 D E Haynes
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import asyncio
+import html
+import html.parser
+import json
+import os
+import socket
+import string
+import sys
+import timeit
+import unittest
+from unittest.mock import patch
+
+from busker.core.scraper import ConnectionPool
+from busker.core.scraper import Form
+from busker.core.scraper import Input
+from busker.core.scraper import Node
+from busker.core.scraper import PageCache
+from busker.core.scraper import Scraper
+from busker.core.test import test_scraper
+from busker.core.transcript import Transcript
+from busker.core.types import Choice
+from busker.plugins.actions import Write
+from busker.plugins.visitor import AsyncVisitor
+from busker.plugins.visitor import CoverageStrategy
+from busker.plugins.visitor import RandomStrategy
+from busker.plugins.visitor import Strategy
+from busker.plugins.visitor import Visitor
+from busker.plugins.visitor import Witness
+
+
+class WitnessTests(unittest.TestCase):
+
+    class Legacy(Witness):
+
+        def handle_starttag(self, tag, attrs):
+            attribs = dict(attrs)
+            try:
+                styles = {
+                    k: v
+                    for k, _, v in [
+                        i.partition(":")
+                        for i in html.unescape(attribs["style"]).replace(" ", "").split(";")
+                    ] if _
+                }
+                if animation := styles.get("animation-duration"):
+                    self.animations[animation] += 1
+                if delay := styles.get("animation-delay"):
+                    self.delays.append(float(delay.rstrip("s")))
+            except KeyError:
+                pass
+
+        def handle_data(self, data):
+            self.words.update([
+                word
+                for i in data.split(" ")
+                if (word := i.strip(string.whitespace + string.punctuation).lower())
+            ])
+
+        def flush(self):
+            pass
+
+    class Recorder(html.parser.HTMLParser):
+
+        def __init__(self):
+            super().__init__()
+            self.events = []
+
+        def handle_starttag(self, tag, attrs):
+            self.events.append((tag, attrs))
+
+        def handle_data(self, data):
+            self.events.append(data)
+
+    @staticmethod
+    def handle(witness: Witness, events: list, rounds: int = 1) -> Witness:
+        for n in range(rounds):
+            for event in events:
+                if isinstance(event, str):
+                    witness.handle_data(event)
+                else:
+                    witness.handle_starttag(*event)
+            witness.flush()
+        return witness
+
+    @staticmethod
+    def node(n: int = 0) -> Node:
+        text = test_scraper.ScraperTests.fixtures.Session
+        return Scraper(cache=PageCache()).extract(Node(None, f"{n:016x}", text=text))
+
+    def witness(self, *values, n=0) -> Witness:
+        rv = Witness()
+        for value in values:
+            rv.update(self.node(n), Choice("ballad-command-form", "ballad-command-form-input-text", value))
+        return rv
+
+    def test_update(self):
+        witness = self.witness("yes", "yes", "look")
+        node = self.node()
+        self.assertEqual(witness.turns, 3)
+        self.assertEqual(witness.commands[node.hash], {"yes": 2, "look": 1})
+        self.assertEqual(witness.options[node.hash], {"1", "2", "i", "info", "no", "yes"})
+        self.assertEqual(witness.untested(node), {"look"})
+        self.assertEqual(witness.words["goal_00a"], 9)
+        self.assertEqual(witness.animations["0.10s"], 12)
+        self.assertEqual(witness.duration, 3 * 4.9)
+
+    def test_handle_events(self):
+        recorder = self.Recorder()
+        recorder.feed("".join(self.node().blocks))
+
+        legacy = self.handle(self.Legacy(), recorder.events, rounds=3)
+        witness = self.handle(Witness(), recorder.events, rounds=3)
+        self.assertTrue(witness.words)
+        self.assertEqual(witness.words, legacy.words)
+        self.assertEqual(witness.animations, legacy.animations)
+        self.assertEqual(witness.delays, legacy.delays)
+
+    def test_state(self):
+        witness = self.witness("yes", "no")
+        state = json.loads(json.dumps(witness.state))
+        rv = Witness.from_state(state)
+        self.assertEqual(rv.state, witness.state)
+        self.assertEqual(rv.turns, 2)
+
+    def test_state_none(self):
+        witness = self.witness("yes", None, None)
+        rv = Witness.from_state(json.loads(json.dumps(witness.state)))
+        self.assertEqual(rv.commands[self.node().hash], {"yes": 1, None: 2})
+        self.assertEqual(rv.state, witness.state)
+
+    def test_merge(self):
+        a = self.witness("yes", "no")
+        b = self.witness("yes", "info", n=1)
+        c = self.witness("1")
+
+        ab_c = Witness.from_state(a.state).merge(b, c)
+        c_ba = Witness.from_state(c.state).merge(Witness.from_state(b.state).merge(a))
+        self.assertEqual(ab_c.state, c_ba.state)
+        self.assertEqual(ab_c.turns, 5)
+        self.assertEqual(ab_c.commands[self.node().hash], {"yes": 1, "no": 1, "1": 1})
+        self.assertEqual(ab_c.words, a.words + b.words + c.words)
+        self.assertAlmostEqual(ab_c.duration, a.duration + b.duration + c.duration)
+
+
+@unittest.skipUnless(os.environ.get("BUSKER_BENCHMARK"), "Set BUSKER_BENCHMARK to run benchmarks")
+class WitnessBenchmarkTests(unittest.TestCase):
+
+    def test_handle_rate(self, rounds=2000):
+        recorder = WitnessTests.Recorder()
+        recorder.feed("".join(WitnessTests.node().blocks))
+        events = recorder.events * 10
+
+        legacy = min(timeit.repeat(
+            lambda: WitnessTests.handle(WitnessTests.Legacy(), events, rounds=1), number=rounds, repeat=3
+        ))
+        batched = min(timeit.repeat(
+            lambda: WitnessTests.handle(Witness(), events, rounds=1), number=rounds, repeat=3
+        ))
+        print(
+            f"Witness: {rounds / batched:.0f} pages/s, legacy: {rounds / legacy:.0f} pages/s",
+            file=sys.stderr
+        )
+
+
+class VisitorTests(unittest.TestCase):
+
+    def test_close_own_pool(self):
+        visitor = Visitor()
+        with patch.object(visitor.scraper.pool, "close") as close:
+            visitor.close()
+        close.assert_called_once()
+
+    def test_close_shared_pool(self):
+        pool = ConnectionPool()
+        visitor = Visitor(pool=pool)
+        self.assertIs(visitor.scraper.pool, pool)
+        with patch.object(pool, "close") as close:
+            visitor.close()
+        close.assert_not_called()
+
+    def test_transcript(self):
+        self.assertIsNone(Visitor().transcript)
+        self.assertIsInstance(Visitor(transcript=True).transcript, Transcript)
+        self.assertIsInstance(AsyncVisitor(transcript=True).transcript, Transcript)
+
+    def test_async_refused(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            url = "http://{0}:{1}/".format(*sock.getsockname())
+
+        visitors = asyncio.run(AsyncVisitor.play(url, number=3))
+        self.assertEqual(len(visitors), 3)
+        self.assertFalse(any(visitor.turns for visitor in visitors))
+
+    def test_async_no_pool(self):
+        visitor = AsyncVisitor()
+        self.assertIsNone(visitor.pool)
+        self.assertIsNone(visitor.scraper.pool)
+
+
+class StrategyTests(unittest.TestCase):
+
+    @staticmethod
+    def node(title: str, *options, n: int = 0) -> Node:
+        form = Form("command", "/command", "post", inputs=(Input("text", values=options),))
+        return Node(None, f"{n:016x}", title=title, blocks=(), options=options, forms=(form,))
+
+    def test_registry(self):
+        self.assertEqual({i.name for i in Strategy.registry()}, {"random", "coverage"})
+        self.assertIsInstance(Visitor().strategy, RandomStrategy)
+
+        # A Strategy must select
+        with self.assertRaises(TypeError):
+            Strategy()
+
+    def test_state(self):
+        a = self.node("A", "x", "y", n=0)
+        b = self.node("A", "x", "y", n=1)
+        self.assertNotEqual(a.hash, b.hash)
+        self.assertEqual(Strategy.state(a), Strategy.state(b))
+        self.assertNotEqual(Strategy.state(a), Strategy.state(self.node("B", "x", "y")))
+
+    def test_untested_first(self):
+        strategy = CoverageStrategy()
+        visitor = Visitor(strategy=strategy)
+        options = ("x", "y", "z")
+        values = [visitor.choose(self.node("A", *options, n=n)).value for n in range(3)]
+        self.assertEqual(sorted(values), sorted(options))
+        self.assertFalse(strategy.graph.frontier)
+        self.assertEqual(strategy.coverage, Strategy.Point(3, 1, 3, 3))
+        self.assertEqual([i.requests for i in strategy.curve], [0, 1, 2, 3])
+
+    def test_frontier(self):
+        strategy = CoverageStrategy()
+        visitor = Visitor(strategy=strategy)
+        a = self.node("A", "w", "x")
+        b = self.node("B", "y", "z")
+        strategy.graph.tried[Strategy.state(a)].add("w")
+
+        choice = visitor.choose(a)
+        self.assertEqual(choice.value, "x")
+        visitor.choose(b, Write(a, choice=choice))
+        self.assertEqual(strategy.graph.frontier, {Strategy.state(b)})
+
+        # All commands of A are tried; the one which leads to B is chosen
+        for n in range(8):
+            with self.subTest(n=n):
+                self.assertEqual(visitor.choose(a).value, "x")
+
+    def test_coverage(self):
+        nodes = [self.node(title, *"pqrstuvw") for title in "ABCD"]
+        results = {}
+        for strategy in (RandomStrategy(), CoverageStrategy()):
+            visitor = Visitor(strategy=strategy)
+            n = 0
+            while strategy.coverage.commands < 32:
+                visitor.choose(nodes[n % 4])
+                n += 1
+            results[strategy.name] = n
+            self.assertEqual(len(list(strategy.report())), len(strategy.curve) - 1)
+
+        self.assertEqual(results["coverage"], 32)
+        self.assertGreaterEqual(results["random"], results["coverage"], results)
+
+    def test_seed(self):
+        nodes = [self.node(title, *"pqrstuvw") for title in "ABCD"]
+        runs = []
+        for seed in (1, 1, 2):
+            visitor = Visitor(seed=seed)
+            self.assertEqual(visitor.seed, seed)
+            runs.append([visitor.choose(nodes[n % 4]).value for n in range(32)])
+
+        self.assertEqual(runs[0], runs[1])
+        self.assertNotEqual(runs[0], runs[2])
+        self.assertIsInstance(Visitor().seed, int)
+
+
+class AsyncVisitorTests(test_scraper.ServerTests):
+
+    def test_unexpected_error(self):
+        choose = AsyncVisitor.choose
+
+        def fail_once(visitor, *args):
+            if visitor.seed == 1:
+                raise IndexError("Cannot choose from an empty sequence")
+            return choose(visitor, *args)
+
+        with patch.object(AsyncVisitor, "choose", autospec=True, side_effect=fail_once):
+            visitors = asyncio.run(AsyncVisitor.play(self.url, number=3, seed=0, timeout=2))
+
+        self.assertEqual([visitor.turns for visitor in visitors], [1, 0, 1])
+
+    def test_broken_responses(self):
+        for path in ("/truncated", "/garbled"):
+            with self.subTest(path=path):
+                visitors = asyncio.run(AsyncVisitor.play(f"{self.url}{path}", number=2, timeout=2))
+                self.assertEqual(len(visitors), 2)
+                self.assertFalse(any(visitor.turns for visitor in visitors))
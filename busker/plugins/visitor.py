@@ -20,100 +20,236 @@
 from collections import Counter
 from collections import defaultdict
 from collections import deque
-import html
+from collections import namedtuple
+from collections.abc import Generator
+import abc
+import asyncio
 import html.parser
+import http.client
 import logging
 import random
+import re
 import string
+import typing
 import urllib.error
 
-from busker.history import SharedHistory
-from busker.scraper import Node
-from busker.scraper import Scraper
-from busker.actions import Read
-from busker.actions import Action
-from busker.actions import Write
-from busker.types import Choice
+from busker.core.graph import Graph
+from busker.core.history import SharedHistory
+from busker.core.scraper import AsyncScraper
+from busker.core.scraper import ConnectionPool
+from busker.core.scraper import Node
+from busker.core.scraper import ResponseTooLarge
+from busker.core.scraper import Scraper
+from busker.core.transcript import Transcript
+from busker.core.types import Choice
+from busker.plugins.actions import Read
+from busker.plugins.actions import Action
+from busker.plugins.actions import Write
 
 
 class Witness(html.parser.HTMLParser):
 
+    # A word is a run without whitespace, less any punctuation at either end
+    word = re.compile("[^\\s{0}](?:\\S*[^\\s{0}])?".format(re.escape(string.punctuation)))
+    animation = re.compile(r"(?:^|;)\s*animation-(duration|delay)\s*:\s*([^;]*?)\s*(?=;|$)")
+
     def __init__(self, convert_charrefs=True):
-        self.options = defaultdict(deque)
-        self.commands = defaultdict(deque)
+        self.options = defaultdict(set)
+        self.commands = defaultdict(Counter)
         self.words = Counter()
         self.animations = Counter()
         self.delays = []
         self.duration = 0
+        self.text = []
+        self.styles = []
         super().__init__(convert_charrefs=convert_charrefs)
 
+    @classmethod
+    def from_state(cls, state: dict) -> typing.Self:
+        rv = cls()
+        rv.options.update({k: set(v) for k, v in state.get("options", {}).items()})
+        rv.commands.update({k: Counter(dict(v)) for k, v in state.get("commands", {}).items()})
+        rv.words.update(state.get("words", {}))
+        rv.animations.update(state.get("animations", {}))
+        rv.delays.extend(state.get("delays", []))
+        rv.duration = state.get("duration", 0)
+        return rv
+
+    @property
+    def state(self) -> dict:
+        """
+        The statistics of this Witness as plain types, which may be serialized as JSON.
+
+        """
+        return dict(
+            options={k: sorted(v) for k, v in self.options.items()},
+            # A value may be None, which is no key for a JSON object
+            commands={
+                k: sorted(([value, n] for value, n in v.items()), key=lambda x: (x[0] is not None, x[0] or ""))
+                for k, v in self.commands.items()
+            },
+            words=dict(self.words),
+            animations=dict(self.animations),
+            delays=sorted(self.delays),
+            duration=self.duration,
+        )
+
+    @property
+    def turns(self) -> int:
+        return sum(i.total() for i in self.commands.values())
+
+    def merge(self, *others: tuple[typing.Self]) -> typing.Self:
+        """
+        Combine the statistics of other Witnesses with this one.
+        The result does not depend on the order of merging.
+
+        """
+        for other in others:
+            for k, v in other.options.items():
+                self.options[k].update(v)
+            for k, v in other.commands.items():
+                self.commands[k].update(v)
+            self.words.update(other.words)
+            self.animations.update(other.animations)
+            self.delays = sorted(self.delays + other.delays)
+            self.duration += other.duration
+        return self
+
     def handle_starttag(self, tag, attrs):
-        attribs = dict(attrs)
-        try:
-            styles = {
-                k: v
-                for k, _, v in [
-                    i.partition(":")
-                    for i in html.unescape(attribs["style"]).replace(" ", "").split(";")
-                ] if _
-            }
-            if animation := styles.get("animation-duration"):
-                self.animations[animation] += 1
-            if delay := styles.get("animation-delay"):
-                self.delays.append(float(delay.rstrip("s")))
-        except KeyError:
-            pass
+        for name, value in attrs:
+            if name == "style" and value and "animation" in value:
+                self.styles.append(value)
 
     def handle_data(self, data):
-        self.words.update([
-            word
-            for i in data.split(" ")
-            if (word := i.strip(string.whitespace + string.punctuation).lower())
-        ])
+        self.text.append(data)
+
+    def flush(self):
+        """
+        Count the words and animations of everything received since the last flush.
+
+        """
+        self.words.update(self.word.findall(" ".join(self.text).lower()))
+        self.text.clear()
+
+        durations = []
+        for name, value in self.animation.findall(";".join(self.styles)):
+            if value and name == "duration":
+                durations.append(value.replace(" ", ""))
+            elif value:
+                self.delays.append(float(value.replace(" ", "").rstrip("s")))
+        self.animations.update(durations)
+        self.styles.clear()
 
     def reset(self):
         super().reset()
-        for variable in (self.words, self.animations, self.delays):
+        for variable in (self.words, self.animations, self.delays, self.text, self.styles):
             variable.clear()
         self.duration = 0
 
     def untested(self, node: Node):
-        return set(self.commands.get(node.hash, [])) - set(self.options.get(node.hash, []))
+        return self.commands.get(node.hash, {}).keys() - self.options.get(node.hash, set())
 
     def update(self, node: Node, choice: Choice):
         if choice:
-            self.commands[node.hash].append(choice.value)
+            self.commands[node.hash][choice.value] += 1
 
-        options = [i for i in node.options if i not in self.options[node.hash]]
-        self.options[node.hash].extend(options)
-        for block in node.blocks:
-            self.feed(block)
+        self.options[node.hash].update(node.options)
+        self.feed("".join(node.blocks))
+        self.flush()
 
         if self.delays:
             self.duration += max(self.delays)
         self.delays.clear()
 
 
-class Visitor(SharedHistory):
+class Strategy(abc.ABC):
+    """
+    Chooses the next command for a Visitor.
 
-    def __init__(self, url=None, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.url = url
-        self.scraper = Scraper()
-        self.witness = Witness()
-        self.actions = deque([Read(url=self.url)])
+    One Strategy may be shared by many Visitors so that what one of them
+    explores, the others need not.
+    What has been explored is kept in a Graph, which may be saved for later runs.
+    The Strategy keeps a curve of coverage against the number of requests,
+    so that strategies may be compared on their cost.
+
+    """
+
+    name = None
+    Point = namedtuple("Point", ["requests", "states", "commands", "options"])
+
+    @classmethod
+    def registry(cls):
+        return cls.__subclasses__()
+
+    @staticmethod
+    def state(node: Node) -> str:
+        return Graph.key(node)
+
+    def __init__(self, graph: Graph = None):
+        self.graph = graph or Graph()
+        self.requests = 0
+        self.curve = [
+            self.Point(
+                0, len(self.graph),
+                sum(len(i) for i in self.graph.tried.values()),
+                sum(len(i) for i in self.graph.options.values()),
+            )
+        ]
 
     @property
-    def turns(self):
-        return len([i for record in self.witness.commands.values() for i in record])
+    def coverage(self) -> Point:
+        return self.curve[-1]._replace(requests=self.requests)
 
-    def choose(self, node: Node) -> Choice:
+    @abc.abstractmethod
+    def select(self, visitor, node: Node, state: str) -> Choice:
+        pass
+
+    def choose(self, visitor, node: Node, action: Action = None) -> Choice:
+        state = self.state(node)
+        self.requests += 1
+        if action and action.prior and action.choice:
+            self.graph.link(self.state(action.prior), action.choice, state)
+
+        point = self.curve[-1]
+        if state not in self.graph.options:
+            point = point._replace(states=point.states + 1)
+        point = point._replace(options=point.options + self.graph.visit(state, node.options))
+
+        rv = self.select(visitor, node, state)
+        if self.graph.mark(state, rv.value):
+            point = point._replace(commands=point.commands + 1)
+
+        if point[1:] != self.curve[-1][1:]:
+            self.curve.append(point._replace(requests=self.requests))
+        return rv
+
+    def report(self) -> Generator[str]:
+        """
+        Generate a line for each request which added to the coverage.
+
+        """
+        for point in self.curve[1:]:
+            yield (
+                f"{self.name:<8} requests={point.requests:<6} states={point.states:<6}"
+                f" commands={point.commands}/{point.options}"
+            )
+
+
+class RandomStrategy(Strategy):
+    """
+    Chooses a form, input and value at random.
+
+    """
+
+    name = "random"
+
+    def select(self, visitor, node: Node, state: str) -> Choice:
         forms = {i.name: i for i in node.forms}
-        rv = Choice(form=random.choice(list(forms)))
+        rv = Choice(form=visitor.rng.choice(list(forms)))
         try:
             inputs = {i.name: i for i in forms[rv.form].inputs}
-            rv = rv._replace(input=random.choice(list(inputs)))
-            rv = rv._replace(value=random.choice(inputs[rv.input].values))
+            rv = rv._replace(input=visitor.rng.choice(list(inputs)))
+            rv = rv._replace(value=visitor.rng.choice(inputs[rv.input].values))
         except IndexError:
             # No values to choose
             pass
@@ -122,10 +258,71 @@ class Visitor(SharedHistory):
             pass
 
         # Back out of dead ends
-        if self.witness.commands[node.hash] and not self.witness.untested(node):
+        if visitor.witness.commands[node.hash] and not visitor.witness.untested(node):
             rv = rv._replace(value=None)
         return rv
 
+
+class CoverageStrategy(Strategy):
+    """
+    Prefers commands not yet tried on a page.
+    When every command of a page has been tried, follows the shortest
+    sequence of recorded commands to a page on the frontier of the graph.
+
+    """
+
+    name = "coverage"
+
+    def select(self, visitor, node: Node, state: str) -> Choice:
+        choices = [
+            Choice(form.name, input.name, value)
+            for form in node.forms
+            for input in form.inputs
+            for value in input.values
+        ] or [Choice(form=form.name) for form in node.forms]
+
+        untested = [i for i in choices if i.value not in self.graph.tried[state]]
+        if untested:
+            return visitor.rng.choice(untested)
+
+        path = self.graph.path(state)
+        return path[0] if path else visitor.rng.choice(choices)
+
+
+class Visitor(SharedHistory):
+
+    def __init__(
+        self, url=None, *args,
+        pool: ConnectionPool = None, strategy: Strategy = None, seed: int = None, transcript: bool = False,
+        **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.url = url
+        self.pool = pool
+        self.scraper = self.open(pool)
+        self.strategy = strategy or RandomStrategy()
+        self.seed = random.randrange(1 << 32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.witness = Witness()
+        # Only kept when asked for, since each new page is compressed
+        self.transcript = Transcript() if transcript else None
+        self.actions = deque([Read(url=self.url)])
+
+    @property
+    def turns(self):
+        return self.witness.turns
+
+    def open(self, pool: ConnectionPool = None) -> Scraper:
+        return Scraper(pool=pool or ConnectionPool())
+
+    def close(self):
+        # A shared pool is closed by its owner
+        if self.pool is None:
+            self.scraper.pool.close()
+
+    def choose(self, node: Node, action: Action = None) -> Choice:
+        return self.strategy.choose(self, node, action)
+
     def __call__(self, action, *args, **kwargs):
 
         self.log(f"Action: {action.__class__.__name__} {action.choice}")
@@ -133,10 +330,76 @@ class Visitor(SharedHistory):
         try:
             node = action.run(self.scraper, **kwargs)
             self.witness.update(node, action.choice)
-            choice = self.choose(node)
-        except urllib.error.HTTPError as e:
+            if self.transcript is not None:
+                self.transcript.add(node, action.choice)
+            choice = self.choose(node, action)
+        except (urllib.error.HTTPError, ResponseTooLarge) as e:
+            self.log(
+                f"Stopped trying {action.__class__.__name__} of {getattr(action.choice, 'value', None)} to {action.url}",
+                level=logging.WARNING
+            )
+            self.log(f"Caught error {e}", level=logging.WARNING)
+            return
+
+        self.actions.append(Write(node, choice=choice))
+
+        return node
+
+
+class AsyncVisitor(Visitor):
+    """
+    A Visitor which plays its session as a coroutine.
+    Each one holds its own connection and session cookies.
+
+    """
+
+    @classmethod
+    async def play(
+        cls, url: str, number: int, concurrency: int = 64, strategy: Strategy = None, seed: int = None,
+        **kwargs
+    ) -> list[typing.Self]:
+        """
+        Run `number` sessions, no more than `concurrency` of them at once.
+        The sessions share a `strategy` if one is given.
+        If a `seed` is given, each session takes the next seed in turn.
+        A session stopped by an unexpected error is logged, and the others play on.
+
+        """
+        limit = asyncio.Semaphore(concurrency)
+        visitors = [cls(url, strategy=strategy, seed=None if seed is None else seed + n) for n in range(number)]
+        results = await asyncio.gather(
+            *(visitor.run(limit=limit, **kwargs) for visitor in visitors), return_exceptions=True
+        )
+        for visitor, result in zip(visitors, results):
+            if isinstance(result, Exception):
+                visitor.log(f"Session {visitor.seed} stopped by {result!r}", level=logging.WARNING)
+            elif isinstance(result, BaseException):
+                raise result
+        return visitors
+
+    def open(self, pool: ConnectionPool = None) -> AsyncScraper:
+        return AsyncScraper()
+
+    async def close(self):
+        await self.scraper.client.close()
+
+    async def __call__(self, action, *args, **kwargs):
+
+        self.log(f"Action: {action.__class__.__name__} {action.choice}")
+
+        try:
+            node = await action.run_async(self.scraper, **kwargs)
+            self.witness.update(node, action.choice)
+            if self.transcript is not None:
+                self.transcript.add(node, action.choice)
+            choice = self.choose(node, action)
+        except (
+            urllib.error.HTTPError, ResponseTooLarge, OSError,
+            # A response which is cut short or garbled
+            asyncio.IncompleteReadError, http.client.HTTPException, ValueError,
+        ) as e:
             self.log(
-                f"Stopped trying {action.__class__.__name__} of {action.choice.value} to {action.url}",
+                f"Stopped trying {action.__class__.__name__} of {getattr(action.choice, 'value', None)} to {action.url}",
                 level=logging.WARNING
             )
             self.log(f"Caught error {e}", level=logging.WARNING)
@@ -145,3 +408,15 @@ class Visitor(SharedHistory):
         self.actions.append(Write(node, choice=choice))
 
         return node
+
+    async def run(self, limit: asyncio.Semaphore = None, **kwargs) -> typing.Self:
+        async with limit or asyncio.Semaphore():
+            try:
+                while self.actions:
+                    action = self.actions.popleft()
+                    node = await self(action, **kwargs)
+                    if node:
+                        self.log(f"Page: {node.title}")
+            finally:
+                await self.close()
+        return self
@@ -25,47 +25,342 @@ Usage:
 
     python -m utils.proofread project/scripts
 
+Results may be kept in a cache file between runs.
+Files are proofed again only when their content changes:
+
+    python -m utils.proofread --cache .proofread.json project/scripts
+
+Scene files may be checked in parallel by a pool of worker processes:
+
+    python -m utils.proofread --jobs 4 project/scripts
+
+Diagnostics may be streamed as JSON Lines or SARIF, for consumption by other tools:
+
+    python -m utils.proofread --format jsonl project/scripts
+
+In watch mode, the utility polls for changes and proofs modified files until interrupted.
+Parsed files are kept in memory, so watch mode takes neither a cache nor worker processes:
+
+    python -m utils.proofread --watch project/scripts
+
 """
 
 import argparse
-from collections import namedtuple
+from collections.abc import Generator
+import concurrent.futures
+import contextlib
+import hashlib
+import itertools
+import json
 import pathlib
-import pprint
-import string
 import sys
+import time
 
-from busker.proofer import Proofer
-from busker.utils.graph import load_rules
+import busker
+from busker.core.proofer import Proofer
 
 
-def main(args):
+# Revise when the layout of cached results changes
+CACHE_FORMAT = 2
+
+
+def digest(*texts: tuple[str]) -> str:
+    hash_ = hashlib.blake2b()
+    for text in texts:
+        hash_.update(text.encode("utf8"))
+    return hash_.hexdigest()
+
+
+def load_cache(path: pathlib.Path = None) -> dict:
+    try:
+        rv = json.loads(path.read_text()) if path else {}
+    except (FileNotFoundError, json.JSONDecodeError):
+        rv = {}
+
+    if rv.get("version") != busker.__version__ or rv.get("format") != CACHE_FORMAT:
+        rv = dict(version=busker.__version__, format=CACHE_FORMAT)
+    rv.setdefault("stage", {})
+    rv.setdefault("scene", {})
+    return rv
+
+
+def save_cache(path: pathlib.Path, cache: dict, limit=4096):
+    scenes = list(cache["scene"].items())[-limit:]
+    cache = dict(cache, scene=dict(scenes))
+    path.write_text(json.dumps(cache, indent=0))
+
+
+def find_paths(inputs: list[pathlib.Path], suffix: str) -> list[pathlib.Path]:
+    rv = [path for i in inputs for path in i.glob(f"*.{suffix}.toml") if i.is_dir()]
+    rv += [path for path in inputs if path.suffixes == [f".{suffix}", ".toml"]]
+    return rv
 
-    stage_scripts = [
-        Proofer.read_script(path) for i in args.input for path in i.glob("*.stage.toml") if i.is_dir()
+
+def sort_paths(paths: list[pathlib.Path]) -> list[pathlib.Path]:
+    # Stage files are checked as a set, and errors of the set go to the last
+    return sorted(paths, key=lambda x: x.resolve())
+
+
+def read_text(path: pathlib.Path) -> tuple[str, str]:
+    try:
+        text = path.read_text()
+    except FileNotFoundError:
+        return None, None
+    else:
+        return digest(text), text
+
+
+def diagnostics(script: Proofer.Script) -> list[tuple[int, str, str]]:
+    return [
+        (line, str(Proofer.classify(error) or ""), str(error))
+        for line, error in script.errors.items()
     ]
-    stage_scripts += [Proofer.read_script(path) for path in args.input if path.suffixes == [".stage", ".toml"]]
-
-    for script in Proofer.check_stage(*stage_scripts):
-        for line, error in reversed(script.errors.items()):
-            print(f"{script.path!s}\t{line:03d}\t{error}", file=sys.stdout)
-        if not script.errors:
-            print(f"{script.path!s} checked; no errors.", file=sys.stderr)
-
-    scene_paths = [path for i in args.input for path in i.glob("*.scene.toml") if i.is_dir()]
-    scene_paths += [path for path in args.input if path.suffixes == [".scene", ".toml"]]
-    for path in scene_paths:
-        script = Proofer.read_script(path)
-        script = Proofer.check_scene(script)
-        for line, error in reversed(script.errors.items()):
-            print(f"{script.path!s}\t{line:03d}\t{error}", file=sys.stdout)
-        if not script.errors:
-            print(f"{script.path!s} checked; no errors.", file=sys.stderr)
+
+
+def load_script(path: pathlib.Path, text: str = None) -> Proofer.Script:
+    if text is None:
+        return Proofer.read_script(path)
+    return Proofer.read_toml(text)._replace(path=path.resolve())
+
+
+def proof_scene(path: pathlib.Path, text: str = None) -> tuple[list[tuple[int, str, str]], float]:
+    start = time.perf_counter()
+    script = Proofer.check_scene(load_script(path, text))
+    return diagnostics(script), time.perf_counter() - start
+
+
+class Report:
+    """
+    Writes diagnostics to stdout as tab-separated lines.
+    Files without errors are acknowledged on stderr.
+
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.start = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def __call__(self, path: pathlib.Path, errors: list[tuple[int, str, str]], elapsed: float = 0, cached=False):
+        self.write(path, errors, elapsed, cached)
+        if not errors:
+            print(f"{path!s} checked; no errors.", file=sys.stderr)
+
+    def write(self, path: pathlib.Path, errors: list[tuple[int, str, str]], elapsed: float, cached: bool):
+        for line, rule, error in reversed(errors):
+            print(f"{path!s}\t{line:03d}\t{error}", file=self.stream)
+
+
+class JSONLinesReport(Report):
+    """
+    Writes each diagnostic as a JSON object on its own line, as soon as it is found.
+
+    """
+
+    def write(self, path: pathlib.Path, errors: list[tuple[int, str, str]], elapsed: float, cached: bool):
+        for line, rule, error in errors:
+            record = dict(
+                path=str(path), line=line, rule=rule, message=error,
+                elapsed=round(elapsed, 6), time=round(time.perf_counter() - self.start, 6),
+                cached=cached,
+            )
+            print(json.dumps(record), file=self.stream, flush=True)
+
+
+class SARIFReport(Report):
+    """
+    Writes a SARIF log, with each result emitted as soon as it is found.
+
+    """
+
+    def __enter__(self):
+        self.results = 0
+        driver = dict(
+            name="busker-proofread",
+            version=busker.__version__,
+            rules=[dict(id=str(rule)) for rule in Proofer.Rule],
+        )
+        header = json.dumps(dict(
+            version="2.1.0",
+            runs=[dict(tool=dict(driver=driver), results=[])],
+        ))
+        # Leave the results array open
+        print(header[:-len("]}]}")], file=self.stream, flush=True)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        print("]}]}", file=self.stream, flush=True)
+        return False
+
+    def write(self, path: pathlib.Path, errors: list[tuple[int, str, str]], elapsed: float, cached: bool):
+        for line, rule, error in errors:
+            location = dict(artifactLocation=dict(uri=path.as_uri()))
+            if line > 0:
+                location["region"] = dict(startLine=line)
+            result = dict(
+                ruleId=rule, level="error", message=dict(text=error),
+                locations=[dict(physicalLocation=location)],
+                properties=dict(
+                    elapsed=round(elapsed, 6), time=round(time.perf_counter() - self.start, 6),
+                    cached=cached,
+                ),
+            )
+            print("," if self.results else "", json.dumps(result), sep="", file=self.stream, flush=True)
+            self.results += 1
+
+
+reports = dict(text=Report, jsonl=JSONLinesReport, sarif=SARIFReport)
+
+
+class Watcher:
+    """
+    Keeps parsed scripts in memory, and proofs them again when their files change.
+
+    """
+
+    def __init__(self, inputs: list[pathlib.Path]):
+        self.inputs = inputs
+        self.stamps = {}
+        self.scripts = {}
+
+    def scan(self) -> tuple[list[pathlib.Path], list[pathlib.Path]]:
+        stamps = {}
+        for path in find_paths(self.inputs, "stage") + find_paths(self.inputs, "scene"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            stamps[path] = (stat.st_mtime_ns, stat.st_size)
+
+        changed = [path for path, stamp in stamps.items() if self.stamps.get(path) != stamp]
+        removed = [path for path in self.stamps if path not in stamps]
+        for path in changed:
+            self.scripts[path] = Proofer.read_script(path)
+        for path in removed:
+            del self.scripts[path]
+
+        self.stamps = stamps
+        return changed, removed
+
+    def poll(self) -> Generator[tuple[pathlib.Path, list[tuple[int, str, str]], float]]:
+        changed, removed = self.scan()
+
+        # Stage files are checked as a set, but are not parsed again
+        if any(path.suffixes == [".stage", ".toml"] for path in changed + removed):
+            start = time.perf_counter()
+            scripts = [
+                self.scripts[path]._replace(errors=dict(self.scripts[path].errors))
+                for path in sort_paths(self.stamps)
+                if path.suffixes == [".stage", ".toml"]
+            ]
+            for script in Proofer.check_stage(*scripts):
+                yield script.path, diagnostics(script), time.perf_counter() - start
+
+        for path in changed:
+            if path.suffixes == [".scene", ".toml"]:
+                start = time.perf_counter()
+                script = self.scripts[path]
+                script = Proofer.check_scene(script._replace(errors=dict(script.errors)))
+                yield script.path, diagnostics(script), time.perf_counter() - start
+
+
+def watch(args):
+    watcher = Watcher(args.input)
+    with reports[args.format]() as report:
+        try:
+            while True:
+                for path, errors, elapsed in watcher.poll():
+                    report(path, errors, elapsed)
+                time.sleep(args.interval)
+        except KeyboardInterrupt:
+            return 0
+
+
+def main(args):
+    if args.watch:
+        return watch(args)
+
+    cache = load_cache(args.cache)
+    with reports[args.format]() as report:
+        stage_paths = sort_paths(find_paths(args.input, "stage"))
+        stage_texts = [read_text(path) for path in stage_paths]
+        stage_scripts = [load_script(path, text) for path, (hash_, text) in zip(stage_paths, stage_texts)]
+
+        # Stage files are checked as a set, in order of their paths
+        key = digest(*(
+            f"{script.path!s}\t{hash_}" for (hash_, text), script in zip(stage_texts, stage_scripts)
+        ))
+        if key in cache["stage"]:
+            for script, errors in zip(stage_scripts, cache["stage"][key]):
+                report(script.path, errors, cached=True)
+        else:
+            results = []
+            start = time.perf_counter()
+            for script in Proofer.check_stage(*stage_scripts):
+                errors = diagnostics(script)
+                report(script.path, errors, time.perf_counter() - start)
+                results.append(errors)
+            cache["stage"] = {key: results}
+
+        scene_paths = find_paths(args.input, "scene")
+        scene_texts = [read_text(path) for path in scene_paths]
+        cached = [hash_ in cache["scene"] for hash_, text in scene_texts]
+        pending = [
+            (path, text) for path, (hash_, text), hit in zip(scene_paths, scene_texts, cached)
+            if not hit
+        ]
+        with contextlib.ExitStack() as stack:
+            if args.jobs > 1 and len(pending) > 1:
+                executor = stack.enter_context(concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs))
+                chunksize = max(1, len(pending) // (args.jobs * 4))
+                results = executor.map(proof_scene, *zip(*pending), chunksize=chunksize)
+            else:
+                results = itertools.starmap(proof_scene, pending)
+
+            # Results arrive in the same order as the scene paths
+            for path, (hash_, text), hit in zip(scene_paths, scene_texts, cached):
+                if hit:
+                    errors, elapsed = cache["scene"].pop(hash_), 0
+                else:
+                    errors, elapsed = next(results)
+
+                if hash_:
+                    cache["scene"][hash_] = errors
+                report(path.resolve(), errors, elapsed, cached=hit)
+
+    if args.cache:
+        save_cache(args.cache, cache)
 
     return 0
 
 
 def parser():
     rv = argparse.ArgumentParser(__doc__)
+    rv.add_argument(
+        "--cache", type=pathlib.Path, default=None,
+        help="Set a path to a file which caches results between runs."
+    )
+    rv.add_argument(
+        "--jobs", type=int, default=1,
+        help="Set the number of processes which check scene files [1]."
+    )
+    rv.add_argument(
+        "--format", choices=list(reports), default="text",
+        help="Set the format of diagnostics written to stdout [text]."
+    )
+    rv.add_argument(
+        "--watch", action="store_true", default=False,
+        help="Keep running, and proof files again whenever they change. Not with --cache or --jobs."
+    )
+    rv.add_argument(
+        "--interval", type=float, default=1.0,
+        help="Set the number of seconds between checks for changes in watch mode [1.0]."
+    )
     rv.add_argument(
         "input", nargs="+", type=pathlib.Path,
         help="Specify input directories or files."
@@ -76,6 +371,8 @@ def parser():
 def run():
     p = parser()
     args = p.parse_args()
+    if args.watch and (args.cache or args.jobs != 1):
+        p.error("--watch does not support --cache or --jobs")
     rv = main(args)
     sys.exit(rv)
 
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+#   encoding: utf-8
+
+# This is part of the Busker library.
+# Copyright (C) 2024 D E Haynes
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import contextlib
+import io
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import textwrap
+import time
+import unittest
+import unittest.mock
+
+from busker.utils.proofread import main
+from busker.utils.proofread import parser
+from busker.utils.proofread import run
+from busker.utils.proofread import Watcher
+
+
+class ProofreadTests(unittest.TestCase):
+
+    stage = textwrap.dedent("""
+    label = "Repo of the Unknown"
+    realm = "busker"
+
+    [[puzzles]]
+    name = "a"
+    init = {"Fruition" = "inception"}
+    """)
+
+    scene = textwrap.dedent("""
+    [ALICE]
+    name = "Alice"
+
+    [[_]]
+    s='''
+    <ALICE>Hey, {BORIS.name}!
+    '''
+    """).strip()
+
+    def setUp(self):
+        self.parent = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.parent.name)
+        self.path.joinpath("story.stage.toml").write_text(self.stage)
+        self.path.joinpath("00.scene.toml").write_text(self.scene)
+        self.path.joinpath("01.scene.toml").write_text(self.scene.replace("BORIS", "ALICE"))
+
+    def tearDown(self):
+        self.parent.cleanup()
+
+    def proofread(self, *args) -> tuple[list[str], list[str]]:
+        args = parser().parse_args([str(i) for i in args])
+        with contextlib.redirect_stdout(io.StringIO()) as out, contextlib.redirect_stderr(io.StringIO()) as err:
+            rv = main(args)
+        self.assertEqual(rv, 0)
+        return out.getvalue().splitlines(), err.getvalue().splitlines()
+
+    def test_proofread(self):
+        out, err = self.proofread(self.path)
+        self.assertEqual(len(out), 1, out)
+        self.assertTrue(out[0].startswith(str(self.path.joinpath("00.scene.toml").resolve())), out)
+        self.assertIn("BORIS", out[0])
+        self.assertEqual(len(err), 2, err)
+
+    def test_proofread_cache(self):
+        cache_path = self.path.joinpath("cache.json")
+        expected = self.proofread("--cache", cache_path, self.path)
+
+        cache = json.loads(cache_path.read_text())
+        self.assertEqual(len(cache["stage"]), 1)
+        self.assertEqual(len(cache["scene"]), 2)
+        self.assertEqual(self.proofread("--cache", cache_path, self.path), expected)
+
+        # Unchanged files are reported from the cache
+        for errors in cache["scene"].values():
+            if errors:
+                errors[0][2] = "Cached error"
+        cache_path.write_text(json.dumps(cache))
+        out, err = self.proofread("--cache", cache_path, self.path)
+        self.assertIn("Cached error", out[0])
+
+        # Modified files are proofed again
+        self.path.joinpath("00.scene.toml").write_text(self.scene.replace("BORIS", "CHARLIE"))
+        out, err = self.proofread("--cache", cache_path, self.path)
+        self.assertIn("CHARLIE", out[0])
+        self.assertEqual(len(json.loads(cache_path.read_text())["scene"]), 3)
+
+    def test_proofread_cache_stage_set(self):
+        cache_path = self.path.joinpath("cache.json")
+        stage_path = self.path.joinpath("story.stage.toml")
+        out, err = self.proofread("--cache", cache_path, stage_path)
+        self.assertFalse(out)
+
+        # The check for an init table spans the set of stage files
+        stage_path.write_text(self.stage.replace("init", "data"))
+        out, err = self.proofread("--cache", cache_path, stage_path)
+        self.assertIn("init", out[0])
+
+        stage_path.write_text(self.stage)
+        out, err = self.proofread("--cache", cache_path, stage_path)
+        self.assertFalse(out)
+        self.assertEqual(len(json.loads(cache_path.read_text())["stage"]), 1)
+
+    def test_proofread_cache_stage_paths(self):
+        cache_path = self.path.joinpath("cache.json")
+        story_path = self.path.joinpath("story.stage.toml")
+        extra_path = self.path.joinpath("extra.stage.toml")
+        extra_path.write_text(self.stage.replace("init", "data").replace('name = "a"', 'name = "b"'))
+        expected = self.proofread("--cache", cache_path, story_path, extra_path)
+        key = next(iter(json.loads(cache_path.read_text())["stage"]))
+
+        # Stage files are checked in order of their paths, however they are given
+        self.assertEqual(self.proofread("--cache", cache_path, extra_path, story_path), expected)
+        self.assertEqual(next(iter(json.loads(cache_path.read_text())["stage"])), key)
+
+        # The same content at another path is checked again
+        story_path.rename(self.path.joinpath("other.stage.toml"))
+        self.proofread("--cache", cache_path, self.path.joinpath("other.stage.toml"), extra_path)
+        self.assertNotEqual(next(iter(json.loads(cache_path.read_text())["stage"])), key)
+
+    def test_proofread_jobs(self, scenes=8):
+        for n in range(scenes):
+            text = self.scene if n % 3 else self.scene.replace("BORIS", "ALICE")
+            self.path.joinpath(f"{n:04d}.scene.toml").write_text(text)
+
+        outputs = {jobs: self.proofread("--jobs", jobs, self.path) for jobs in (1, 2)}
+        self.assertEqual(outputs[1], outputs[2])
+        self.assertEqual(len(outputs[2][0]), 1 + scenes - len(range(0, scenes, 3)))
+
+    def test_watch_options(self):
+        for args in (["--cache", "cache.json"], ["--jobs", "2"]):
+            with self.subTest(args=args):
+                argv = ["proofread", "--watch", *args, str(self.path)]
+                with (
+                    unittest.mock.patch("sys.argv", argv),
+                    contextlib.redirect_stderr(io.StringIO()) as err,
+                    self.assertRaises(SystemExit) as context,
+                ):
+                    run()
+                self.assertEqual(context.exception.code, 2)
+                self.assertIn("--watch", err.getvalue())
+
+    def test_proofread_jsonl(self):
+        out, err = self.proofread("--format", "jsonl", self.path)
+        self.assertEqual(len(out), 1, out)
+        record = json.loads(out[0])
+        self.assertEqual(record["path"], str(self.path.joinpath("00.scene.toml").resolve()))
+        self.assertEqual(record["line"], 6)
+        self.assertEqual(record["rule"], "scene-role-undeclared")
+        self.assertIn("BORIS", record["message"])
+        self.assertIsInstance(record["elapsed"], float)
+        self.assertFalse(record["cached"])
+
+    def test_proofread_sarif(self):
+        self.path.joinpath("02.scene.toml").write_text("]")
+        out, err = self.proofread("--format", "sarif", self.path)
+        data = json.loads("\n".join(out))
+        self.assertEqual(data["version"], "2.1.0")
+        run = data["runs"][0]
+        self.assertIn("toml-decode", [i["id"] for i in run["tool"]["driver"]["rules"]])
+        self.assertEqual(
+            sorted(i["ruleId"] for i in run["results"]),
+            ["scene-role-undeclared", "toml-decode"]
+        )
+        self.assertTrue(all(
+            i["locations"][0]["physicalLocation"]["region"]["startLine"] > 0 for i in run["results"]
+        ))
+
+
+@unittest.skipUnless(os.environ.get("BUSKER_BENCHMARK"), "Set BUSKER_BENCHMARK to run benchmarks")
+class ProofreadBenchmarkTests(unittest.TestCase):
+
+    setUp = ProofreadTests.setUp
+    tearDown = ProofreadTests.tearDown
+    proofread = ProofreadTests.proofread
+    stage = ProofreadTests.stage
+    scene = ProofreadTests.scene
+
+    def test_proofread_jobs(self, scenes=5000):
+        for n in range(scenes):
+            text = self.scene if n % 7 else self.scene.replace("BORIS", "ALICE")
+            self.path.joinpath(f"{n:04d}.scene.toml").write_text(text)
+
+        timings = {}
+        outputs = {}
+        for jobs in (1, 4):
+            start = time.perf_counter()
+            outputs[jobs] = self.proofread("--jobs", jobs, self.path)
+            timings[jobs] = time.perf_counter() - start
+
+        self.assertEqual(outputs[1], outputs[4])
+        print(
+            f"proofread: {scenes} scenes in {timings[1]:.2f}s with 1 job, {timings[4]:.2f}s with 4;",
+            f"speedup {timings[1] / timings[4]:.2f}",
+            file=sys.stderr
+        )
+
+
+class WatcherTests(unittest.TestCase):
+
+    setUp = ProofreadTests.setUp
+    tearDown = ProofreadTests.tearDown
+    proofread = ProofreadTests.proofread
+    stage = ProofreadTests.stage
+    scene = ProofreadTests.scene
+
+    def test_poll(self):
+        watcher = Watcher([self.path])
+        rv = {path: errors for path, errors, elapsed in watcher.poll()}
+        self.assertEqual(len(rv), 3)
+        self.assertEqual(len(watcher.scripts), 3)
+        self.assertFalse(rv[self.path.joinpath("story.stage.toml").resolve()])
+        self.assertEqual(rv[self.path.joinpath("00.scene.toml").resolve()][0][1], "scene-role-undeclared")
+        self.assertIn("BORIS", rv[self.path.joinpath("00.scene.toml").resolve()][0][2])
+
+        self.assertFalse(list(watcher.poll()))
+
+        # Only the modified scene is proofed again
+        scene_path = self.path.joinpath("00.scene.toml")
+        scene_path.write_text(self.scene.replace("BORIS", "ALICE") + "\n")
+        self.assertEqual([i[:2] for i in watcher.poll()], [(scene_path.resolve(), [])])
+
+        # A change to any stage file rechecks the set
+        extra_path = self.path.joinpath("extra.stage.toml")
+        extra_path.write_text(self.stage.replace("init", "data").replace('name = "a"', 'name = "b"'))
+        rv = {path: errors for path, errors, elapsed in watcher.poll()}
+        self.assertEqual(len(rv), 2)
+        self.assertFalse(any(rv.values()), rv)
+
+        self.path.joinpath("story.stage.toml").unlink()
+        rv = {path: errors for path, errors, elapsed in watcher.poll()}
+        self.assertEqual(len(rv), 1)
+        self.assertIn("init", rv[extra_path.resolve()][0][2])
+        self.assertEqual(len(watcher.scripts), 3)
+
+    def test_stage_order(self):
+        story_path = self.path.joinpath("story.stage.toml")
+        story_path.write_text(self.stage.replace("init", "data"))
+        extra_path = self.path.joinpath("extra.stage.toml")
+        extra_path.write_text(self.stage.replace("init", "data").replace('name = "a"', 'name = "b"'))
+
+        # Watch mode blames the same file as a batch, however the files are given
+        out, err = self.proofread(story_path, extra_path)
+        self.assertEqual(len(out), 1, out)
+        self.assertTrue(out[0].startswith(str(story_path.resolve())), out)
+
+        watcher = Watcher([story_path, extra_path])
+        rv = {path: errors for path, errors, elapsed in watcher.poll()}
+        self.assertFalse(rv[extra_path.resolve()])
+        self.assertIn("init", rv[story_path.resolve()][0][2])